@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Artifact Manager - Per-job work directories under a disk quota
+Every intermediate a job writes lives in its own directory; directories of
+finished jobs and least recently used cache entries are evicted when the quota
+or the disk's free-space floor would be exceeded
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from config import Config
+from asset_cache import get_cache
+
+RELEASED = '.released'  # marker: the job no longer needs its directory
+
+
+def partial_path(path):
+    """Name of a video while it is being encoded (a hard link to the encoder's output)"""
+    path = Path(path)
+    return path.with_name(f"{path.name}.part")
+
+
+def _files(root):
+    for path in Path(root).rglob('*'):
+        try:
+            stat = path.lstat()
+        except FileNotFoundError:
+            continue
+        if path.is_file():
+            yield path, stat
+
+
+class ArtifactManager:
+    """Work directories of jobs under `root`, sharing `quota_bytes` with the asset cache
+
+    Materialised assets are hard links to cache entries, so usage counts each
+    inode once. Only released directories are ever deleted.
+    """
+
+    def __init__(self, root=None, quota_bytes=None, min_free_bytes=None, cache=None):
+        self.root = Path(root or Config.JOB_WORK_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.quota_bytes = Config.ARTIFACT_QUOTA_BYTES if quota_bytes is None else quota_bytes
+        self.min_free_bytes = Config.ARTIFACT_MIN_FREE_BYTES if min_free_bytes is None else min_free_bytes
+        self.cache = cache or get_cache()
+        self._lock = threading.Lock()
+        self.evicted_jobs = 0
+
+    def job_dir(self, job):
+        """Work directory of a job (an id or a name), created on first use"""
+        path = self.root / (f"job-{job:05d}" if isinstance(job, int) else str(job))
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def artifacts(self, job):
+        """{relative path: bytes} of every file a job has written"""
+        path = self.job_dir(job)
+        return {str(p.relative_to(path)): stat.st_size for p, stat in _files(path) if p.name != RELEASED}
+
+    def release(self, job):
+        """Let the quota reclaim a job's directory (after upload, or once it has given up)"""
+        (self.job_dir(job) / RELEASED).touch()
+
+    def usage(self):
+        """Bytes used by job directories and the asset cache, each hard-linked file once"""
+        inodes = {}
+        for root in (self.root, self.cache.root):
+            for _, stat in _files(root):
+                inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+        return sum(inodes.values())
+
+    def _released(self):
+        """Released job directories, least recently released first"""
+        found = []
+        for path in self.root.iterdir():
+            try:
+                found.append(((path / RELEASED).stat().st_mtime, path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        return [path for _, path in sorted(found)]
+
+    def _sweep_orphans(self):
+        """Delete temp files and partial videos left by crashed producers"""
+        cutoff = time.time() - Config.JOB_LEASE_SECONDS
+        for root, pattern in ((self.cache.root, '.tmp-*'), (self.root, '*.part')):
+            for path in Path(root).rglob(pattern):
+                try:
+                    if path.lstat().st_mtime < cutoff:
+                        path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _over(self, needed):
+        """Bytes to free before `needed` more fit both the quota and the free-space floor"""
+        free = shutil.disk_usage(self.root).free
+        return max(self.usage() + needed - self.quota_bytes, self.min_free_bytes + needed - free)
+
+    def ensure_space(self, needed=0):
+        """Evict until `needed` more bytes fit; returns the bytes still missing (0 if it fits)
+
+        Released job directories go first, then asset cache entries no job
+        links to, least recently used first.
+        """
+        with self._lock:
+            self._sweep_orphans()
+            excess = self._over(needed)
+            for path in self._released():
+                if excess <= 0:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                self.evicted_jobs += 1
+                excess = self._over(needed)
+            if excess > 0:
+                self.cache.reclaim(excess)
+                excess = self._over(needed)
+        if excess > 0:
+            print(f"  ⚠️ {excess / 1e6:.0f} MB short of the artifact quota / free-space floor", flush=True)
+        return max(excess, 0)
+
+    def stats(self):
+        return {
+            'bytes': self.usage(),
+            'quota_bytes': self.quota_bytes,
+            'free_bytes': shutil.disk_usage(self.root).free,
+            'jobs': sum(1 for path in self.root.iterdir() if path.is_dir()),
+            'released': len(self._released()),
+            'evicted_jobs': self.evicted_jobs,
+        }
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_artifacts():
+    """Process-wide manager for Config.JOB_WORK_DIR"""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = ArtifactManager()
+        return _default_manager
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Asset Cache - Content-addressed on-disk cache for generated media
+Skips paid API calls and re-encoding when the inputs have not changed
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from config import Config
+
+
+def make_key(*parts):
+    """Hash the parts that fully describe an asset (model, voice, prompt, size...)"""
+    blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, for keying outputs derived from it"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AssetCache:
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or Config.CACHE_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = Config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key, suffix=''):
+        """Location of a cache entry (sharded by the first two hex digits)"""
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def lookup(self, key, suffix=''):
+        """Return the cached path and mark it recently used, or None on a miss"""
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def fetch(self, parts, dest, producer):
+        """Materialise the asset described by `parts` at `dest`
+
+        On a miss `producer(path)` is called to write the asset to a temporary
+        file, which is then atomically moved into the cache.
+        """
+        dest = Path(dest)
+        cached = self.entry(parts, dest.suffix, producer)
+        if cached.resolve() != dest.resolve():
+            self.materialise(cached, dest)
+        return dest
+
+    def entry(self, parts, suffix, producer):
+        """Path of the cache entry for `parts`, running `producer` on a miss"""
+        key = make_key(*parts)
+        cached = self.lookup(key, suffix)
+        if cached is None:
+            cached = self._produce(key, suffix, producer)
+        return cached
+
+    def entries(self, items, producer):
+        """Paths of entries that are made together, e.g. several outputs of one ffmpeg run
+
+        `items` maps a name to (parts, suffix). On any miss `producer({name: path})`
+        is called once with a temporary file for each missing entry only; each
+        is then published separately, so later lookups hit them one by one.
+        """
+        keys = {name: (make_key(*parts), suffix) for name, (parts, suffix) in items.items()}
+        found = {name: self.lookup(key, suffix) for name, (key, suffix) in keys.items()}
+        missing = [name for name, path in found.items() if path is None]
+        if not missing:
+            return found
+        temps = {}
+        try:
+            for name in missing:
+                path = self.path_for(*keys[name])
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix=keys[name][1])
+                os.close(fd)
+                temps[name] = Path(tmp)
+            producer(dict(temps))
+            for name, tmp in temps.items():
+                found[name] = self.path_for(*keys[name])
+                os.replace(tmp, found[name])
+        finally:
+            for tmp in temps.values():
+                if tmp.exists():
+                    tmp.unlink()
+        self.evict(keep=[found[name] for name in missing])
+        return found
+
+    def store(self, parts, suffix, data):
+        """Publish in-memory bytes as the entry for `parts` and return its path"""
+        def write(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        return self._produce(make_key(*parts), suffix, write)
+
+    @staticmethod
+    def materialise(cached, dest):
+        """Hard-link a cache entry to `dest` (copying across filesystems)
+
+        Entries are immutable and eviction only unlinks, so a linked `dest`
+        keeps its data without a second copy on disk.
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if os.path.samefile(cached, dest):
+                return  # already linked; renaming a link over itself would leave the temp link behind
+        except OSError:
+            pass
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(cached, tmp)
+        except OSError:
+            shutil.copyfile(cached, tmp)
+        os.replace(tmp, dest)
+
+    def _produce(self, key, suffix, producer):
+        """Run the producer into a temp file and publish it with os.replace"""
+        path = self.path_for(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix=suffix)
+        os.close(fd)
+        try:
+            producer(Path(tmp))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def _entries(self):
+        for path in self.root.rglob('*'):
+            if path.name.startswith('.tmp-'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted by another worker mid-scan
+            if path.is_file():
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self, keep=None, max_bytes=None):
+        """Delete least recently used entries until the cache fits max_bytes
+
+        `keep` (a path or a list of paths) is never deleted. `max_bytes`
+        defaults to the cache's own limit.
+        """
+        keep = {keep} if isinstance(keep, (str, os.PathLike)) else set(keep or ())
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= limit:
+                    break
+                if path in keep:
+                    continue
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def reclaim(self, needed):
+        """Delete least recently used entries until `needed` bytes of disk are freed; returns the bytes freed
+
+        Entries still hard-linked into a job's work directory are skipped:
+        deleting them would free nothing.
+        """
+        freed = 0
+        with self._lock:
+            for _, size, path in sorted(self._entries()):
+                if freed >= needed:
+                    break
+                try:
+                    if path.stat().st_nlink > 1:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                freed += size
+                self.evictions += 1
+        return freed
+
+    def stats(self):
+        """Hit/miss counters plus current size of the cache"""
+        entries = list(self._entries())
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Process-wide cache instance rooted at Config.CACHE_DIR"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AssetCache()
+    return _default_cache
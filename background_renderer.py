@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Background Renderer - Streaming animated backgrounds
+Computes the colour curve in one NumPy pass and pipes raw frames into ffmpeg
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+import process_runner
+import render_graph
+
+
+def color_curve(frame_count, fps):
+    """Return an (N, 3) uint8 array with the RGB value of every frame"""
+    t = np.arange(frame_count, dtype=np.float64) / fps
+    curve = np.empty((frame_count, 3), dtype=np.uint8)
+    curve[:, 0] = 120 + 60 * np.sin(t * np.pi * 2 / 5)
+    curve[:, 1] = 100 + 55 * np.cos(t * np.pi * 2 / 7)
+    curve[:, 2] = 140 + 45 * np.sin(t * np.pi * 2 / 11)
+    return curve
+
+
+def iter_color_frames(curve, width, height):
+    """Yield one frame per curve entry, reusing a single preallocated buffer"""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for rgb in curve:
+        frame[:] = rgb
+        yield frame
+
+
+@contextmanager
+def audio_input(audio_path=None, audio_data=None):
+    """Yield an ffmpeg input path for audio given as a file or as in-memory bytes
+
+    Bytes are written into a named pipe by a helper thread while ffmpeg reads
+    it, so encoded TTS audio never touches the disk. Platforms without
+    os.mkfifo fall back to a temporary file.
+    """
+    if audio_data is None:
+        yield str(audio_path) if audio_path else None
+        return
+
+    with tempfile.TemporaryDirectory(prefix='audio-') as tmp:
+        path = os.path.join(tmp, 'audio')
+        if not hasattr(os, 'mkfifo'):
+            with open(path, 'wb') as f:
+                f.write(audio_data)
+            yield path
+            return
+
+        os.mkfifo(path)
+
+        def feed():
+            try:
+                with open(path, 'wb') as fifo:
+                    fifo.write(audio_data)
+            except (BrokenPipeError, OSError):
+                pass  # ffmpeg stopped reading; pipe_frames reports its error
+
+        writer = threading.Thread(target=feed, name='audio-fifo', daemon=True)
+        writer.start()
+        try:
+            yield path
+        finally:
+            if writer.is_alive():
+                # Unblock a writer still waiting for ffmpeg to open the pipe
+                try:
+                    os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass
+            writer.join(timeout=5)
+
+
+def stream_to_ffmpeg(frames, output_filename, width, height, fps, audio_path=None,
+                     preset="ultrafast", threads=2, audio_data=None):
+    """Pipe raw RGB frames into a single ffmpeg process and mux the audio track
+
+    The audio comes from `audio_path` or, without touching the disk, from the
+    encoded bytes in `audio_data`.
+    """
+    with audio_input(audio_path, audio_data) as audio:
+        graph = color_graph(width, height, fps, audio=bool(audio), preset=preset, threads=threads)
+        cmd = render_graph.command(graph, {'video': output_filename}, audio=[audio] if audio else [])
+        return pipe_frames(cmd, frames)
+
+
+def color_graph(width, height, fps, audio=None, preset="ultrafast", threads=2, key=None):
+    """Render graph of an RGB frame stream with an optional audio track (identified by `audio`)
+
+    `key` identifies the frames, e.g. ('color-curve', duration) for the breathing background.
+    """
+    return render_graph.graph(
+        video=render_graph.frames((width, height), fps, pix_fmt='rgb24', key=key),
+        audio=[audio] if audio else [],
+        outputs={'video': {'preset': preset, 'threads': threads}},
+    )
+
+
+def pipe_frames(cmd, frames):
+    """Run an ffmpeg command whose input 0 is `pipe:0` and feed it raw frames"""
+    with tempfile.TemporaryFile() as stderr:
+        proc = process_runner.popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+        frame_count = 0
+        try:
+            for frame in frames:
+                proc.stdin.write(memoryview(frame).cast('B'))
+                frame_count += 1
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        if proc.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed: {stderr.read().decode(errors='replace').strip()}")
+    return frame_count
+
+
+def render_color_background(output_filename, duration, audio_path=None,
+                            width=1280, height=720, fps=24, audio_data=None):
+    """Render the breathing colour background for `duration` seconds"""
+    curve = color_curve(int(duration * fps), fps)
+    frames = iter_color_frames(curve, width, height)
+    return stream_to_ffmpeg(frames, output_filename, width, height, fps,
+                            audio_path=audio_path, audio_data=audio_data)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Batch Runner - Generate and render N videos per cycle
+Network-bound OpenAI calls run on a thread pool, ffmpeg encodes on a process pool;
+with STREAM_UPLOAD each upload starts on the first fragments of its encode
+"""
+
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from config import Config
+from artifact_manager import ArtifactManager, partial_path
+import clients
+
+
+def _encode_job(work_dir, assets):
+    """Process-pool entry point: composite one job inside its own work dir"""
+    from content_creator import ContentCreator
+    return str(ContentCreator(work_dir).composite(assets))
+
+
+def _prepare_job(job, work_dir, content):
+    """Thread-pool entry point: generate the assets for one script"""
+    from content_creator import ContentCreator
+
+    print(f"  🧘 [Job {job}] {content['title']}", flush=True)
+    assets = ContentCreator(work_dir).prepare_assets(content)
+    return content, assets
+
+
+_publishers = threading.local()
+
+
+def _publish(video_path, content, finished=None):
+    """Thread-pool entry point: upload with this thread's own publisher
+
+    The YouTube service object (httplib2) is not thread-safe, so concurrent
+    uploads must not share one.
+    """
+    from youtube_publisher import YouTubePublisher
+
+    if not hasattr(_publishers, 'publisher'):
+        _publishers.publisher = YouTubePublisher()
+    return _publishers.publisher.publish(video_path, content, finished)
+
+
+class _StreamStarter:
+    """Submits each streamed upload once its encode has started writing
+
+    ContentCreator links the master's partial_path when ffmpeg starts on it,
+    so a job still queued behind other encodes holds no network thread or
+    upload session, and its upload's stall clock doesn't run while it waits.
+    """
+
+    def __init__(self, pool, upload, poll_seconds=0.2):
+        self.pool = pool
+        self.upload = upload
+        self.poll_seconds = poll_seconds
+        self.futures = {}
+        self._waiting = []
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stream-starter', daemon=True)
+        self._thread.start()
+
+    def add(self, video_path, content, encode_future, result):
+        with self._lock:
+            self._waiting.append((video_path, content, encode_future, result))
+
+    def _start_ready(self):
+        with self._lock:
+            ready = [w for w in self._waiting if w[2].done() or partial_path(w[0]).exists()]
+            self._waiting = [w for w in self._waiting if not any(w is r for r in ready)]
+            remaining = len(self._waiting)
+        for video_path, content, encode_future, result in ready:
+            future = self.pool.submit(self.upload, video_path, content, encode_future.done)
+            self.futures[future] = result, content
+        return remaining
+
+    def _run(self):
+        while True:
+            closing = self._closing.is_set()
+            if not self._start_ready() and closing:
+                return
+            time.sleep(self.poll_seconds)
+
+    def close(self):
+        """Return the upload futures once every added job's upload is submitted (when its encode is done)"""
+        self._closing.set()
+        self._thread.join()
+        return self.futures
+
+
+def _stream_scripts(count, attempts=3):
+    """Yield `count` teachings, requesting them in as few chat calls as possible"""
+    from content_generator import ContentGenerator
+
+    generator = ContentGenerator()
+    produced = 0
+    for _ in range(attempts):
+        for content in generator.generate_batch(count - produced):
+            yield content
+            produced += 1
+        if produced >= count:
+            return
+
+
+def run_batch(count, concurrency=None, publish=False):
+    """Produce `count` videos with at most `concurrency` jobs in flight
+
+    Every job gets an isolated work directory so concurrent jobs (and
+    concurrent batches on the same host) never overwrite each other's files.
+    Space for each job is made under the artifact quota before it starts, and
+    uploaded jobs' directories become evictable.
+    """
+    concurrency = concurrency or Config.BATCH_CONCURRENCY
+    encode_workers = max(1, min(concurrency, Config.ENCODE_WORKERS))
+    batch_id = datetime.now().strftime('%Y%m%d-%H%M%S') + f"-{os.getpid()}"
+    # One manager over every batch's jobs, so the quota holds across batches
+    artifacts = ArtifactManager(Config.BATCH_OUTPUT_DIR)
+
+    print(f"📦 Batch {batch_id}: {count} videos, {concurrency} network workers, "
+          f"{encode_workers} encode workers", flush=True)
+
+    from content_generator import record_posted
+
+    streaming = publish and Config.STREAM_UPLOAD
+    if streaming:
+        from content_creator import master_video_path
+
+    results = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as network_pool, \
+            ProcessPoolExecutor(max_workers=encode_workers,
+                                # Forking while network threads hold locks (cache, logging, httplib2) can deadlock the child
+                                mp_context=multiprocessing.get_context('forkserver')) as encode_pool:
+        # Asset generation for each script starts as soon as it is parsed from the stream
+        prepare_futures = {}
+        for job, content in enumerate(_stream_scripts(count)):
+            artifacts.ensure_space(Config.ARTIFACT_JOB_BYTES)
+            work_dir = artifacts.job_dir(f"{batch_id}-job-{job:03d}")
+            future = network_pool.submit(_prepare_job, job, work_dir, content)
+            prepare_futures[future] = (job, work_dir)
+        for job in range(len(prepare_futures), count):
+            print(f"❌ [Job {job}] No script generated", flush=True)
+            results.append({'job': job, 'work_dir': str(artifacts.root / f"{batch_id}-job-{job:03d}"), 'error': 'no script'})
+
+        encode_futures = {}
+        upload_futures = {}
+        starter = _StreamStarter(network_pool, _publish) if streaming else None
+        for future in as_completed(prepare_futures):
+            job, work_dir = prepare_futures[future]
+            try:
+                content, assets = future.result()
+            except Exception as e:
+                print(f"❌ [Job {job}] Asset generation failed: {e}", flush=True)
+                results.append({'job': job, 'work_dir': str(work_dir), 'error': str(e)})
+                continue
+            encode_future = encode_pool.submit(_encode_job, str(work_dir), assets)
+            result = {'job': job, 'work_dir': str(work_dir), 'title': content['title']}
+            encode_futures[encode_future] = (result, content)
+            if streaming:
+                # Uploads the fragmented master as the encode process writes it
+                starter.add(master_video_path(work_dir), content, encode_future, result)
+
+        for future in as_completed(encode_futures):
+            result, content = encode_futures[future]
+            try:
+                result['video'] = future.result()
+                print(f"✅ [Job {result['job']}] Rendered → {result['video']}", flush=True)
+            except Exception as e:
+                print(f"❌ [Job {result['job']}] Render failed: {e}", flush=True)
+                result['error'] = str(e)
+                if not streaming:
+                    results.append(result)
+                continue
+            if streaming:
+                continue
+            if publish:
+                upload_futures[network_pool.submit(_publish, result['video'], content)] = result, content
+            else:
+                record_posted(content)
+                results.append(result)
+        if starter:
+            upload_futures.update(starter.close())
+
+        for future in as_completed(upload_futures):
+            result, content = upload_futures[future]
+            try:
+                result['video_id'] = future.result()
+                print(f"🚀 [Job {result['job']}] Uploaded → {result['video_id']}", flush=True)
+                record_posted(content)
+                artifacts.release(Path(result['work_dir']).name)
+            except Exception as e:
+                if 'error' not in result:  # a failed render already ended its streamed upload
+                    print(f"❌ [Job {result['job']}] Upload failed: {e}", flush=True)
+                    result['error'] = str(e)
+            results.append(result)
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if 'error' not in r)
+    print(f"📦 Batch {batch_id} finished: {succeeded}/{count} succeeded in {elapsed:.1f}s", flush=True)
+    report = clients.latency_summary()
+    if report:
+        print(report, flush=True)
+    return sorted(results, key=lambda r: r['job'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and render a batch of videos")
+    parser.add_argument('--count', type=int, default=1, help='Number of videos to produce')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help=f'Jobs in flight (default {Config.BATCH_CONCURRENCY})')
+    parser.add_argument('--publish', action='store_true', help='Upload each video to YouTube when rendered')
+    args = parser.parse_args()
+
+    results = run_batch(args.count, args.concurrency, args.publish)
+    if any('error' in r for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
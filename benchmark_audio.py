@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Audio Benchmark - In-memory TTS audio vs. the MP3 → WAV file round trips
+Reports wall time, peak RSS and bytes written to disk per voice track length
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from pathlib import Path
+from benchmark_common import measure, report, sine_mp3
+
+DURATIONS = [30, 60, 180]
+FPS = 24
+WIDTH, HEIGHT = 1280, 720
+
+
+def render_files(tts_bytes, work_dir, output_filename):
+    """The previous create_video audio path: cache → voice.mp3 → WAV → cache → voice.wav
+
+    pydub's from_mp3/export is reproduced with ffmpeg directly (decode to an
+    in-memory PCM copy, write a WAV) so the baseline runs without ffprobe.
+    """
+    import media_probe
+    from background_renderer import render_color_background
+
+    cached_mp3 = work_dir / 'cache-voice.mp3'
+    cached_mp3.write_bytes(tts_bytes)
+    shutil.copyfile(cached_mp3, work_dir / 'voice.mp3')
+    cached_wav = work_dir / 'cache-voice.wav'
+    info = media_probe.mp3_info(tts_bytes)
+    pcm = subprocess.run(['ffmpeg', '-loglevel', 'error', '-i', str(work_dir / 'voice.mp3'), '-f', 's16le', 'pipe:1'],
+                         stdin=subprocess.DEVNULL, capture_output=True, check=True).stdout
+    with wave.open(str(cached_wav), 'wb') as w:
+        w.setnchannels(info.channels)
+        w.setsampwidth(2)
+        w.setframerate(info.sample_rate)
+        w.writeframes(pcm)
+    shutil.copyfile(cached_wav, work_dir / 'voice.wav')
+    duration = media_probe.duration(work_dir / 'voice.wav')
+
+    rendered = work_dir / 'cache-video.mp4'
+    frames = render_color_background(rendered, duration, audio_path=work_dir / 'voice.wav',
+                                     width=WIDTH, height=HEIGHT, fps=FPS)
+    shutil.copyfile(rendered, output_filename)
+    return frames
+
+
+def render_stream(tts_bytes, work_dir, output_filename):
+    """The current path: MP3 bytes piped to ffmpeg, stored once for reuse"""
+    import media_probe
+    from asset_cache import AssetCache
+    from background_renderer import render_color_background
+
+    cache = AssetCache(root=work_dir / 'cache')
+    duration = media_probe.mp3_info(tts_bytes).duration
+    frames = {}
+    cache.fetch(('bench', len(tts_bytes)), output_filename,
+                lambda path: frames.setdefault('count', render_color_background(
+                    path, duration, width=WIDTH, height=HEIGHT, fps=FPS, audio_data=tts_bytes)))
+    cache.store(('bench-voice', len(tts_bytes)), '.mp3', tts_bytes)
+    return frames['count']
+
+
+PATHS = {
+    'files': render_files,
+    'stream': render_stream,
+}
+
+
+def run_worker(path_name, mp3_path, output_filename):
+    """Render once in this process and print the measurements as JSON"""
+    tts_bytes = Path(mp3_path).read_bytes()  # stands in for the TTS response body
+    with tempfile.TemporaryDirectory(dir=Path(output_filename).parent) as work_dir:
+        start = time.perf_counter()
+        frames = PATHS[path_name](tts_bytes, Path(work_dir), output_filename)
+        elapsed = time.perf_counter() - start
+        # Hard links into the cache share their blocks, so count inodes once
+        inodes = {}
+        for p in list(Path(work_dir).rglob('*')) + [Path(output_filename)]:
+            if p.is_file():
+                stat = p.stat()
+                inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+        written = sum(inodes.values())
+    report({'frames': frames, 'seconds': elapsed, 'disk_written_mb': written / 1e6})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--durations', type=int, nargs='+', default=DURATIONS)
+    parser.add_argument('--paths', nargs='+', default=list(PATHS), choices=list(PATHS))
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--worker', choices=list(PATHS), help=argparse.SUPPRESS)
+    parser.add_argument('--audio', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.audio, args.output)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in args.durations:
+            mp3_path = Path(tmp) / f'voice_{seconds}s.mp3'
+            sine_mp3(mp3_path, seconds)
+            for path_name in args.paths:
+                output = Path(tmp) / f'{path_name}_{seconds}s.mp4'
+                row = {'path': path_name, 'duration': seconds,
+                       **measure(__file__, ['--worker', path_name, '--audio', mp3_path, '--output', output])}
+                results.append(row)
+                if 'error' in row:
+                    print(f"❌ {path_name:>6} {seconds:>4}s  {row['error']}")
+                else:
+                    print(f"📊 {path_name:>6} {seconds:>4}s  {row['seconds']:7.2f}s  "
+                          f"disk {row['disk_written_mb']:7.1f} MB  peak RSS {row['peak_rss_mb']:7.1f} MB "
+                          f"(ffmpeg {row['ffmpeg_peak_rss_mb']:.1f} MB)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark Common - Scaffolding shared by the benchmark_* scripts
+Each case runs in a fresh interpreter (so peak RSS is its own) that prints its
+measurements as one JSON line; fixtures are synthetic stand-ins for DALL·E
+images and TTS voice-overs
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import wave
+
+
+def peak_rss():
+    """Peak RSS of this process and of its largest child (ffmpeg), in MB"""
+    # ru_maxrss is reported in KiB on Linux
+    return {
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'ffmpeg_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def report(measurements):
+    """Worker side: print a case's measurements, plus peak RSS, for measure()"""
+    print(json.dumps({**measurements, **peak_rss()}))
+
+
+def measure(script, argv, env=None):
+    """Run `script` with `argv` in a fresh interpreter; returns the JSON it reported, or {'error': ...}"""
+    script = os.path.abspath(script)
+    result = subprocess.run([sys.executable, script, *map(str, argv)], capture_output=True, text=True,
+                            env=env, cwd=os.path.dirname(script))
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def synthetic_image(path, size=(1024, 1792)):
+    """A DALL·E sized portrait: a gradient with concentric rings"""
+    from PIL import Image, ImageDraw
+
+    width, height = size
+    image = Image.new('RGB', size)
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 4):
+        draw.rectangle([0, y, width, y + 3], fill=(40 + y // 16, 30 + y // 24, 120 + y // 20))
+    for r in range(60, 500, 40):
+        draw.ellipse([width // 2 - r, height // 2 - r, width // 2 + r, height // 2 + r],
+                     outline=(255, 220, 150), width=3)
+    image.save(path)
+    return path
+
+
+def sine_mp3(path, seconds, frequency=220):
+    """An MP3 shaped like TTS output (24 kHz mono, 32 kbps)"""
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', f'sine=frequency={frequency}:duration={seconds}',
+         '-ar', '24000', '-ac', '1', '-c:a', 'libmp3lame', '-b:a', '32k', str(path)],
+        stdin=subprocess.DEVNULL, check=True
+    )
+    return path
+
+
+def silent_wav(path, seconds, rate=24000):
+    """A silent mono 16-bit WAV voice-over"""
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b'\x00\x00' * int(seconds * rate))
+    return path
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Encode Benchmark - Compare Config.ENCODE_PROFILES on a synthetic short
+Records encode time, output size and SSIM against a near-lossless reference
+and against the zoompan filter the Ken Burns frames replaced; with --renditions, compares one split fan-out render against separate renders
+"""
+
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+# The compositor never calls OpenAI; a placeholder key lets ContentCreator initialise offline
+os.environ.setdefault('OPENAI_API_KEY', 'offline-benchmark')
+
+from benchmark_common import silent_wav, synthetic_image
+from config import Config
+from content_creator import ContentCreator
+import subtitle_timing
+
+REFERENCE_PROFILE = {'preset': 'ultrafast', 'crf': 0, 'tune': 'stillimage', 'supersample': 2, 'gop_seconds': 1}
+
+
+def make_inputs(directory, seconds):
+    """Synthetic DALL-E sized image, silent voice-over and captions"""
+    image_path = synthetic_image(directory / 'image.png')
+    audio_path = silent_wav(directory / 'voice.wav', seconds)
+
+    subtitles_path = directory / 'subtitles.ass'
+    cues = subtitle_timing.time_cues("Breathe in slowly, and let the light settle in your heart.", seconds)
+    subtitles_path.write_text(subtitle_timing.to_ass(cues), encoding='utf-8')
+    return image_path, audio_path, subtitles_path
+
+
+def ssim(distorted, reference):
+    """Mean SSIM (All) reported by ffmpeg's ssim filter"""
+    result = subprocess.run(
+        ['ffmpeg', '-i', str(distorted), '-i', str(reference), '-lavfi', 'ssim', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    match = re.search(r'All:([0-9.]+)', result.stderr)
+    return float(match.group(1)) if match else None
+
+
+def zoompan_reference(inputs, seconds, output):
+    """The Ken Burns zoom as the original ffmpeg zoompan filter drew it, losslessly encoded
+
+    The source is first cropped to the output's aspect ratio, as motion_plan
+    does, so the comparison measures the motion rather than a stretch.
+    """
+    image_path, _, subtitles_path = inputs
+    width, height = Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT
+    frames = int(round(seconds * Config.VIDEO_FPS))
+    video_filter = (
+        f"crop='min(iw,ih*{width}/{height})':'min(iw,ih*{width}/{height})*{height}/{width}',"
+        f"scale={width * 2}:{height * 2},"
+        f"zoompan=z='min(zoom+0.0005,1.1)':d={frames}:"
+        f"x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={width}x{height}:fps={Config.VIDEO_FPS},"
+        f"subtitles={subtitles_path}"
+    )
+    subprocess.run(
+        ['ffmpeg', '-y', '-loglevel', 'error', '-i', str(image_path), '-vf', video_filter, '-frames:v', str(frames),
+         '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '0', '-pix_fmt', 'yuv420p', str(output)],
+        stdin=subprocess.DEVNULL, check=True
+    )
+    return output
+
+
+def render(creator, profile, inputs, output):
+    """Encode once with a profile, returning wall time in seconds"""
+    creator.encode_profile = profile
+    image_path, audio_path, subtitles_path = inputs
+    started = time.perf_counter()
+    creator._render_video(image_path, audio_path, subtitles_path, None, output)
+    return time.perf_counter() - started
+
+
+def cpu_seconds():
+    """CPU used so far by this process (frame generation) and its children (ffmpeg)"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def fan_out(creator, inputs, names):
+    """Wall and CPU seconds of one split render of `names` vs. one render per rendition"""
+    image_path, audio_path, subtitles_path = inputs
+    outputs = [(creator._rendition(name), creator._rendition_path(name, creator._rendition(name)))
+               for name in names]
+    results = {}
+    for mode, runs in (('fan-out', [outputs]), ('separate', [[output] for output in outputs])):
+        started, cpu = time.perf_counter(), cpu_seconds()
+        for run in runs:
+            creator._render_outputs(image_path, audio_path, subtitles_path, None, run)
+        results[mode] = {'wall_seconds': time.perf_counter() - started, 'cpu_seconds': cpu_seconds() - cpu}
+        print(f"📊 {mode:>9}  {results[mode]['wall_seconds']:7.2f}s wall  {results[mode]['cpu_seconds']:7.2f}s CPU  "
+              f"({', '.join(names)})", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', nargs='+', default=list(Config.ENCODE_PROFILES))
+    parser.add_argument('--seconds', type=float, default=10.0, help='Length of the synthetic short')
+    parser.add_argument('--renditions', nargs='+', choices=list(Config.RENDITIONS),
+                        help='Compare a split fan-out of these renditions with separate renders instead')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    if args.renditions:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            results = fan_out(ContentCreator(tmp), make_inputs(tmp, args.seconds), args.renditions)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs = make_inputs(tmp, args.seconds)
+        creator = ContentCreator(tmp)
+
+        print("🎯 Rendering reference...", flush=True)
+        reference = tmp / 'reference.mp4'
+        render(creator, REFERENCE_PROFILE, inputs, reference)
+        zoompan = zoompan_reference(inputs, args.seconds, tmp / 'zoompan.mp4')
+
+        for name in args.profiles:
+            output = tmp / f'{name}.mp4'
+            seconds = render(creator, Config.encode_profile(name), inputs, output)
+            row = {
+                'profile': name,
+                **Config.encode_profile(name),
+                'encode_seconds': seconds,
+                'realtime_factor': args.seconds / seconds,
+                'size_bytes': output.stat().st_size,
+                'ssim': ssim(output, reference),
+                'ssim_zoompan': ssim(output, zoompan),
+            }
+            results.append(row)
+            print(f"📊 {name:>9}  {seconds:7.2f}s  ({row['realtime_factor']:.2f}x realtime)  "
+                  f"{row['size_bytes'] / 1024:8.0f} KiB  SSIM {row['ssim']}  vs zoompan {row['ssim_zoompan']}",
+                  flush=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
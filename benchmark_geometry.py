@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Geometry Benchmark - Procedural background throughput at Shorts resolution
+Reports grid precompute time, frame generation fps and generate+encode fps
+(with the real-time factor) for every sacred_geometry pattern
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import sacred_geometry
+
+
+def bench(pattern, seconds, width, height, fps, preset):
+    started = time.perf_counter()
+    sacred_geometry.fields(pattern, width, height)
+    precompute = time.perf_counter() - started
+
+    frame_count = int(seconds * fps)
+    started = time.perf_counter()
+    for _ in sacred_geometry.iter_frames(pattern, frame_count, fps, width, height):
+        pass
+    generate = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        sacred_geometry.render_geometry(os.path.join(tmp, 'bench.mp4'), seconds, pattern=pattern,
+                                        width=width, height=height, fps=fps, preset=preset)
+        encode = time.perf_counter() - started
+
+    print(f"📊 {pattern:<15} precompute {precompute:5.2f}s  generate {frame_count / generate:6.1f} fps  "
+          f"with encode {frame_count / encode:6.1f} fps ({seconds / encode:4.2f}x real time)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--size', default='1080x1920')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--preset', default='ultrafast')
+    parser.add_argument('--patterns', nargs='+', default=list(sacred_geometry.PATTERNS),
+                        choices=sacred_geometry.PATTERNS)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    print(f"🖥️ {os.cpu_count()} CPUs, {width}x{height} @ {args.fps}fps, x264 {args.preset}")
+    for pattern in args.patterns:
+        bench(pattern, args.seconds, width, height, args.fps, args.preset)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark - End-to-end runs against deterministic offline stand-ins
+OpenAI (DALL·E image + TTS), gTTS and YouTube are replaced by a synthetic image
+served locally, sine-tone "voice" MP3s and fake_youtube, so ContentCreator,
+video_generation_upgrade and YouTubePublisher can be measured without API credits.
+Records throughput, latency percentiles and peak memory, and fails on
+regressions against a stored baseline.
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from benchmark_common import measure, report, sine_mp3, synthetic_image
+
+TARGETS = ('creator', 'videogen', 'publish')
+WORDS = [40, 120]
+SIZES = ['540x960', '1080x1920']
+VIDEOGEN_SIZE = '1280x720'  # video_generation_upgrade renders at a fixed size
+WORDS_PER_SECOND = 2.5      # ~150 wpm, the pace of the TTS voices
+REPEAT = 3
+TOLERANCE = 0.25            # allowed slowdown / memory growth before a case regresses
+FAKE_TOKEN = {'token': 'offline-benchmark', 'token_uri': 'http://127.0.0.1/token',
+              'client_id': 'benchmark', 'client_secret': 'benchmark'}
+
+SCRIPT_WORDS = ("breathe into the stillness where every sacred pattern returns to light and the quiet "
+                "mind remembers its own infinite nature while the heart opens like a lotus").split()
+
+
+def script_for(words):
+    """Deterministic teaching of exactly `words` words"""
+    text = ' '.join(SCRIPT_WORDS[i % len(SCRIPT_WORDS)] for i in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def content_for(words):
+    return {
+        'title': f'Benchmark Teaching ({words} words)',
+        'script': script_for(words),
+        'visual_prompt': 'flower of life glowing over a calm ocean at dawn',
+        'theme': 'sacred geometry and divine patterns',
+    }
+
+
+def _ffmpeg(*args):
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', *args], stdin=subprocess.DEVNULL, check=True)
+
+
+def make_fixtures(directory, words_list, sizes):
+    """Synthetic DALL·E image, a music track, and one voice MP3 and upload video per case"""
+    synthetic_image(directory / 'image.png')
+
+    music_dir = directory / 'music'
+    music_dir.mkdir()
+    _ffmpeg('-f', 'lavfi', '-i', 'anoisesrc=color=pink:seed=7:amplitude=0.3:duration=20',
+            '-ar', '44100', '-ac', '2', '-c:a', 'libmp3lame', '-b:a', '128k', str(music_dir / 'ambient.mp3'))
+
+    for words in words_list:
+        seconds = words / WORDS_PER_SECOND
+        sine_mp3(directory / f'voice_{words}.mp3', seconds)
+        for size in sizes:
+            _ffmpeg('-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=30:duration={seconds}',
+                    '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-c:a', 'aac',
+                    '-movflags', '+faststart', str(directory / f'upload_{words}_{size}.mp4'))
+
+
+class FakeOpenAI:
+    """The slice of the OpenAI client ContentCreator uses, answered locally
+
+    images.generate returns a URL on the fixture server; audio.speech.create
+    returns the fixture voice MP3 for the benchmark case.
+    """
+
+    def __init__(self, image_url, voice_data):
+        self.images = SimpleNamespace(generate=lambda **kwargs: SimpleNamespace(data=[SimpleNamespace(url=image_url)]))
+        self.audio = SimpleNamespace(speech=SimpleNamespace(create=lambda **kwargs: SimpleNamespace(content=voice_data)))
+
+
+def run_creator(args, work_dir):
+    from config import Config
+    from content_creator import ContentCreator
+
+    Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT = (int(v) for v in args.size.split('x'))
+    voice_data = Path(args.fixtures, f'voice_{args.words}.mp3').read_bytes()
+    creator = ContentCreator(output_dir=work_dir / 'video')
+    creator.client = FakeOpenAI(f"{args.fixture_url}/image.png", voice_data)
+    return creator.create_video(content_for(args.words))
+
+
+def run_videogen(args, work_dir):
+    import video_generation_upgrade
+
+    voice_data = Path(args.fixtures, f'voice_{args.words}.mp3').read_bytes()
+    # gTTS stand-in: same bytes every time, no network
+    video_generation_upgrade.synthesize_voice = lambda text: voice_data
+    output = video_generation_upgrade.create_video(script_for(args.words), str(work_dir / 'video.mp4'))
+    if output is None:
+        raise RuntimeError('video_generation_upgrade.create_video failed')
+    return output
+
+
+def run_publish(args, work_dir):
+    from youtube_publisher import YouTubePublisher
+
+    video = Path(args.fixtures, f'upload_{args.words}_{args.size}.mp4')
+    return YouTubePublisher().publish(video, content_for(args.words))
+
+
+RUNNERS = {
+    'creator': run_creator,
+    'videogen': run_videogen,
+    'publish': run_publish,
+}
+
+
+def run_worker(args):
+    """Run one case once in this (fresh) process and print the measurements as JSON"""
+    import process_runner
+    import tracing
+
+    with tempfile.TemporaryDirectory(dir=args.fixtures) as work_dir:
+        start = time.perf_counter()
+        RUNNERS[args.worker](args, Path(work_dir))
+        elapsed = time.perf_counter() - start
+    report({
+        'seconds': elapsed,
+        'spawns': process_runner.spawn_total(),
+        'stages': {name: round(stage['sum'], 3) for name, stage in tracing.stage_report().items()},
+    })
+
+
+def measure_case(target, words, size, fixtures, fixture_url, youtube_url):
+    """Run one case in a fresh interpreter with an empty cache, so nothing is reused"""
+    with tempfile.TemporaryDirectory(dir=fixtures) as scratch:
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY='offline-benchmark',
+            YOUTUBE_TOKEN=json.dumps(FAKE_TOKEN),
+            YOUTUBE_API_ENDPOINT=youtube_url,
+            UPLOAD_STATE_FILE=str(Path(scratch, 'upload_sessions.json')),
+            CACHE_DIR=str(Path(scratch, 'cache')),
+            DEDUPE_DB_PATH=str(Path(scratch, 'dedupe.sqlite3')),
+            TREND_DB_PATH=str(Path(scratch, 'trends.sqlite3')),
+            MUSIC_DIR=str(Path(fixtures, 'music')),
+            TRACE_FILE='',
+            IMAGE_SOURCE='dalle',
+        )
+        return measure(__file__, ['--worker', target, '--words', words, '--size', size,
+                                  '--fixtures', fixtures, '--fixture-url', fixture_url], env=env)
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile (q in 0-100) of a non-empty list"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(target, words, size, runs):
+    ok = [run for run in runs if 'error' not in run]
+    row = {'target': target, 'words': words, 'size': size, 'runs': len(runs), 'errors': len(runs) - len(ok)}
+    if not ok:
+        row['error'] = runs[-1]['error']
+        return row
+    seconds = [run['seconds'] for run in ok]
+    row.update({
+        'p50_seconds': percentile(seconds, 50),
+        'p95_seconds': percentile(seconds, 95),
+        'p99_seconds': percentile(seconds, 99),
+        'videos_per_hour': 3600 * len(seconds) / sum(seconds),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in ok),
+        'ffmpeg_peak_rss_mb': max(run['ffmpeg_peak_rss_mb'] for run in ok),
+        'spawns': ok[-1]['spawns'],
+        'stages': ok[-1]['stages'],
+    })
+    return row
+
+
+def case_id(row):
+    return f"{row['target']}/{row['words']}w/{row['size']}"
+
+
+def regressions(results, baseline, tolerance):
+    """Cases that are slower (p95) or larger (peak RSS) than the baseline allows"""
+    previous = {case_id(row): row for row in baseline}
+    found = []
+    for row in results:
+        before = previous.get(case_id(row))
+        if before is None or 'error' in before:
+            continue
+        if 'error' in row:
+            found.append(f"{case_id(row)}: failed ({row['error']})")
+            continue
+        for field in ('p95_seconds', 'peak_rss_mb'):
+            if row[field] > before[field] * (1 + tolerance):
+                found.append(f"{case_id(row)}: {field} {row[field]:.2f} vs baseline {before[field]:.2f}")
+    return found
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves the fixture directory (the fake DALL·E image URL)"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=TARGETS)
+    parser.add_argument('--words', type=int, nargs='+', default=WORDS, help='Script lengths')
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help='Output sizes for creator and publish')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Cold runs per case')
+    parser.add_argument('--json', default='output/benchmark_pipeline.json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Fail if a case regresses against this results file')
+    parser.add_argument('--save-baseline', help='Also write the results here as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--worker', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--size', help=argparse.SUPPRESS)
+    parser.add_argument('--fixtures', help=argparse.SUPPRESS)
+    parser.add_argument('--fixture-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.words = args.words[0]
+        run_worker(args)
+        return 0
+
+    from fake_youtube import FakeYouTubeServer
+
+    cases = [(target, words, VIDEOGEN_SIZE if target == 'videogen' else size)
+             for target in args.targets for words in args.words
+             for size in (args.sizes[:1] if target == 'videogen' else args.sizes)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, FakeYouTubeServer() as youtube:
+        fixtures = Path(tmp)
+        make_fixtures(fixtures, args.words, args.sizes)
+        images = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_FixtureHandler, directory=str(fixtures)))
+        threading.Thread(target=images.serve_forever, daemon=True).start()
+        fixture_url = f"http://127.0.0.1:{images.server_address[1]}"
+        print(f"🖥️ {os.cpu_count()} CPUs, {len(cases)} cases × {args.repeat} cold runs", flush=True)
+        try:
+            for target, words, size in cases:
+                runs = [measure_case(target, words, size, fixtures, fixture_url, youtube.url)
+                        for _ in range(args.repeat)]
+                row = summarize(target, words, size, runs)
+                results.append(row)
+                if 'error' in row:
+                    print(f"❌ {case_id(row):<28} {row['error']}", flush=True)
+                else:
+                    print(f"📊 {case_id(row):<28} p50 {row['p50_seconds']:6.2f}s  p95 {row['p95_seconds']:6.2f}s  "
+                          f"{row['videos_per_hour']:7.1f} videos/h  peak RSS {row['peak_rss_mb']:6.1f} MB "
+                          f"(ffmpeg {row['ffmpeg_peak_rss_mb']:.1f} MB)", flush=True)
+        finally:
+            images.shutdown()
+            images.server_close()
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        if not Path(args.baseline).exists():
+            print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline to create one")
+            return 0
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"🐢 Regression {line}")
+        if found:
+            return 1
+        print(f"✅ No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
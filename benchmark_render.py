@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Render Benchmark - Streaming renderer vs. the MoviePy clip-per-frame path
+Reports frames per second and peak RSS for 30s, 60s and 180s voice tracks
+(the moviepy renderer needs requirements-dev.txt)
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import wave
+from pathlib import Path
+from benchmark_common import measure, report, silent_wav
+
+DURATIONS = [30, 60, 180]
+FPS = 24
+WIDTH, HEIGHT = 1280, 720
+
+
+def render_moviepy(audio_path, output_filename):
+    """The previous create_video background path, kept for comparison"""
+    import numpy as np
+    from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
+
+    audio_clip = AudioFileClip(str(audio_path))
+    duration = audio_clip.duration
+    clips = []
+    frames = int(duration * FPS)
+    for i in range(frames):
+        r = int(120 + 60 * np.sin(i / FPS * np.pi * 2 / 5))
+        g = int(100 + 55 * np.cos(i / FPS * np.pi * 2 / 7))
+        b = int(140 + 45 * np.sin(i / FPS * np.pi * 2 / 11))
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        frame[:, :, 0] = r
+        frame[:, :, 1] = g
+        frame[:, :, 2] = b
+        clips.append(ImageClip(frame, duration=1.0 / FPS))
+    background = concatenate_videoclips(clips, method="compose")
+    video = background.set_audio(audio_clip).set_duration(duration)
+    video.write_videofile(
+        str(output_filename), fps=FPS, codec="libx264", audio_codec="aac",
+        threads=2, preset="ultrafast", ffmpeg_params=["-movflags", "+faststart"],
+        verbose=False, logger=None
+    )
+    background.close()
+    video.close()
+    audio_clip.close()
+    return frames
+
+
+def render_streaming(audio_path, output_filename):
+    """The frame-generator path used by create_video"""
+    from background_renderer import render_color_background
+
+    with wave.open(str(audio_path), 'rb') as w:
+        duration = w.getnframes() / w.getframerate()
+    return render_color_background(output_filename, duration, audio_path=audio_path,
+                                   width=WIDTH, height=HEIGHT, fps=FPS)
+
+
+RENDERERS = {
+    'moviepy': render_moviepy,
+    'streaming': render_streaming,
+}
+
+
+def run_worker(renderer, audio_path, output_filename):
+    """Render once in this process and print the measurements as JSON"""
+    start = time.perf_counter()
+    frames = RENDERERS[renderer](audio_path, output_filename)
+    elapsed = time.perf_counter() - start
+    report({'frames': frames, 'seconds': elapsed, 'fps': frames / elapsed})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--durations', type=int, nargs='+', default=DURATIONS)
+    parser.add_argument('--renderers', nargs='+', default=list(RENDERERS), choices=list(RENDERERS))
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--worker', choices=list(RENDERERS), help=argparse.SUPPRESS)
+    parser.add_argument('--audio', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.audio, args.output)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in args.durations:
+            audio_path = Path(tmp) / f'voice_{seconds}s.wav'
+            silent_wav(audio_path, seconds, rate=22050)  # stands in for a gTTS voice-over
+            for renderer in args.renderers:
+                output = Path(tmp) / f'{renderer}_{seconds}s.mp4'
+                row = {'renderer': renderer, 'duration': seconds,
+                       **measure(__file__, ['--worker', renderer, '--audio', audio_path, '--output', output])}
+                results.append(row)
+                if 'error' in row:
+                    print(f"❌ {renderer:>9} {seconds:>4}s  {row['error']}")
+                else:
+                    print(f"📊 {renderer:>9} {seconds:>4}s  {row['fps']:8.1f} fps  "
+                          f"{row['seconds']:7.2f}s  peak RSS {row['peak_rss_mb']:7.1f} MB "
+                          f"(ffmpeg {row['ffmpeg_peak_rss_mb']:.1f} MB)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
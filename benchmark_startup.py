@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - Cold-start cost of the cron entry point and each stage module
+Runs fresh interpreters with -X importtime, reports cumulative import time and the
+heaviest imports, times each import on the wall clock, and times
+`empire_engine.py --once` to its first log line
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MODULES = ['empire_engine', 'content_generator', 'content_creator', 'youtube_publisher',
+           'video_generation_upgrade', 'batch_runner']
+TARGET_SECONDS = 1.0
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module):
+    """{module: (self µs, cumulative µs)} for `import module` in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=HERE)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def import_seconds(module):
+    """Wall-clock seconds `import module` takes in a fresh interpreter (no -X importtime overhead)"""
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=HERE)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def first_log_line(env):
+    """Seconds from spawning `empire_engine.py --once` to its first line of output"""
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-u', 'empire_engine.py', '--once'], cwd=HERE, env=env,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        line = proc.stdout.readline()
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+    return elapsed, line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--top', type=int, default=5, help='Heaviest imports to list per module')
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts and imports to time (the median is reported)')
+    parser.add_argument('--target', type=float, default=TARGET_SECONDS,
+                        help='Fail if the first log line takes longer than this (seconds)')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    results = {'imports': {}}
+    for module in args.modules:
+        times = import_times(module)
+        heaviest = sorted(((own, name) for name, (own, _) in times.items()), reverse=True)[:args.top]
+        wall = sorted(import_seconds(module) for _ in range(args.runs))[args.runs // 2]
+        results['imports'][module] = {
+            'cumulative_ms': times[module][1] / 1000,
+            'wall_ms': wall * 1000,
+            'heaviest': {name: own / 1000 for own, name in heaviest},
+        }
+        print(f"📦 {module:<26} {times[module][1] / 1000:7.1f} ms  (wall {wall * 1000:5.1f} ms)  "
+              + ', '.join(f"{name} {own / 1000:.0f}" for own, name in heaviest), flush=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Placeholder credentials and an empty queue: the run exits right after scheduling
+        env = dict(os.environ, OPENAI_API_KEY='startup-benchmark', YOUTUBE_TOKEN='{"token": "x"}',
+                   FIREBASE_CONFIG='{}', JOB_DB_PATH=str(Path(tmp, 'jobs.sqlite3')), SCHEDULE_AHEAD_SLOTS='0',
+                   TRACE_FILE='')
+        samples = sorted(first_log_line(env) for _ in range(args.runs))
+    seconds, line = samples[len(samples) // 2]
+    results['first_log_line'] = {'seconds': seconds, 'line': line, 'target_seconds': args.target,
+                                 'runs': [s for s, _ in samples]}
+    print(f"⏱️ First log line after {seconds * 1000:.0f} ms (median of {args.runs}): {line}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if seconds > args.target:
+        print(f"❌ Slower than the {args.target:.1f}s target")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Subtitle Benchmark - Time subtitle_timing across thousands of scripts
+Reports microseconds per script for cue timing and SRT/ASS rendering
+"""
+
+import argparse
+import random
+import statistics
+import time
+import subtitle_timing
+
+VOCABULARY = (
+    "breathe light heart stillness awareness gratitude presence energy sacred "
+    "divine wisdom ancient universe consciousness intention manifest alignment "
+    "chakra healing compassion love moment peace inner journey soul spirit"
+).split()
+
+
+def make_scripts(count, seed=7):
+    """Deterministic pseudo-teachings of 15-80 words with punctuation"""
+    rng = random.Random(seed)
+    scripts = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(15, 80)):
+            word = rng.choice(VOCABULARY)
+            roll = rng.random()
+            if roll < 0.08:
+                word += ','
+            elif roll < 0.14:
+                word += '.'
+            words.append(word)
+        scripts.append(' '.join(words) + '.')
+    return scripts
+
+
+def bench(label, func, scripts):
+    """Time func(script) for every script; print mean/p50/p99 in microseconds"""
+    samples = []
+    for script in scripts:
+        started = time.perf_counter()
+        func(script)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"📊 {label:<18} mean {statistics.fmean(samples):7.1f}µs  "
+          f"p50 {samples[len(samples) // 2]:7.1f}µs  p99 {p99:7.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scripts', type=int, default=5000)
+    args = parser.parse_args()
+
+    scripts = make_scripts(args.scripts)
+    bench('time_cues', lambda s: subtitle_timing.time_cues(s, 30.0), scripts)
+    bench('time_cues + to_srt', lambda s: subtitle_timing.to_srt(subtitle_timing.time_cues(s, 30.0)), scripts)
+    bench('time_cues + to_ass', lambda s: subtitle_timing.to_ass(subtitle_timing.time_cues(s, 30.0)), scripts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Clients - Shared, pooled API clients
+One keep-alive OpenAI client and one requests.Session per process, with
+per-endpoint rate limits, jittered retries on 429/5xx and latency histograms
+"""
+
+import bisect
+import random
+import threading
+import time
+from config import Config
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120)
+
+_lock = threading.Lock()
+_openai = None
+_async_openai = None
+_session = None
+_limiters = {}
+_histograms = {}
+
+
+class RateLimiter:
+    """Token bucket: `rate` units per `per` seconds, bursting up to `burst`"""
+
+    def __init__(self, rate, per=60.0, burst=None):
+        self.rate = rate / per
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self, amount):
+        """Take `amount` tokens (going into debt if needed); return the wait in seconds"""
+        amount = min(amount, self.capacity)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, amount=1):
+        wait = self._reserve(amount)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, amount=1):
+        import asyncio
+        wait = self._reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class LatencyHistogram:
+    """Cumulative-bucket latency histogram (Prometheus-style)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0.0
+        self.lock = threading.Lock()
+
+    def note(self, field, amount=1):
+        """Add to one of the errors / retries / throttled counters"""
+        with self.lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for i, count in enumerate(self.counts):
+                if count and seen + count >= rank:
+                    lower = self.buckets[i - 1] if i else 0.0
+                    upper = self.buckets[i] if i < len(self.buckets) else self.max
+                    return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+                seen += count
+            return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count, 'sum': self.sum, 'max': self.max,
+            'p50': self.quantile(0.5), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99),
+            'errors': self.errors, 'retries': self.retries, 'throttled_seconds': self.throttled,
+            'buckets': dict(zip(self.buckets + (float('inf'),), self.counts)),
+        }
+
+
+def limiter(endpoint):
+    """Shared rate limiter for an endpoint (None when Config.RATE_LIMITS has no entry)"""
+    with _lock:
+        if endpoint not in _limiters:
+            rate = Config.RATE_LIMITS.get(endpoint)
+            _limiters[endpoint] = RateLimiter(rate) if rate else None
+        return _limiters[endpoint]
+
+
+def histogram(endpoint):
+    with _lock:
+        if endpoint not in _histograms:
+            _histograms[endpoint] = LatencyHistogram()
+        return _histograms[endpoint]
+
+
+def latency_report():
+    """{endpoint: snapshot} for every endpoint called so far"""
+    with _lock:
+        endpoints = list(_histograms.items())
+    return {endpoint: hist.snapshot() for endpoint, hist in endpoints}
+
+
+def _status(obj):
+    """HTTP status of a response or an API/requests exception, if it has one"""
+    status = getattr(obj, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(obj, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after(obj):
+    headers = getattr(obj, 'headers', None) or getattr(getattr(obj, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after') or headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _transient(error):
+    """Retry 429/5xx responses and connection-level failures"""
+    status = _status(error)
+    if status is not None:
+        return status in RETRY_STATUS
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or name in (
+        'APIConnectionError', 'APITimeoutError', 'ConnectTimeout', 'ReadTimeout', 'ChunkedEncodingError'
+    ) or 'ConnectionError' in name
+
+
+def _discard(response):
+    """Release a response we are about to retry so its connection returns to the pool"""
+    close = getattr(response, 'close', None)
+    if callable(close):
+        close()
+
+
+def _delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than a server's Retry-After"""
+    delay = random.uniform(0, min(Config.HTTP_MAX_BACKOFF, Config.HTTP_BASE_BACKOFF * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def call(endpoint, func, *args, cost=1, **kwargs):
+    """Call `func` under `endpoint`'s rate limit, retrying transient failures
+
+    `cost` is what one call spends from the limit (1 request, or e.g. the
+    characters of a TTS input). A response object whose status_code is
+    retriable is retried too, and returned as-is on the last attempt.
+    """
+    hist = histogram(endpoint)
+    bucket = limiter(endpoint)
+    for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+        if bucket:
+            hist.note('throttled', bucket.acquire(cost))
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            hist.observe(time.perf_counter() - started)
+            hist.note('errors')
+            if attempt >= Config.HTTP_MAX_RETRIES or not _transient(e):
+                raise
+            hist.note('retries')
+            time.sleep(_delay(attempt, _retry_after(e)))
+            continue
+        hist.observe(time.perf_counter() - started)
+        if _status(result) in RETRY_STATUS and attempt < Config.HTTP_MAX_RETRIES:
+            hist.note('retries')
+            _discard(result)
+            time.sleep(_delay(attempt, _retry_after(result)))
+            continue
+        return result
+
+
+async def acall(endpoint, func, *args, cost=1, **kwargs):
+    """Async `call`: `func` returns an awaitable (e.g. an AsyncOpenAI method)"""
+    import asyncio  # only async callers pay for the import (see benchmark_startup)
+    hist = histogram(endpoint)
+    bucket = limiter(endpoint)
+    for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+        if bucket:
+            hist.note('throttled', await bucket.acquire_async(cost))
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            hist.observe(time.perf_counter() - started)
+            hist.note('errors')
+            if attempt >= Config.HTTP_MAX_RETRIES or not _transient(e):
+                raise
+            hist.note('retries')
+            await asyncio.sleep(_delay(attempt, _retry_after(e)))
+            continue
+        hist.observe(time.perf_counter() - started)
+        if _status(result) in RETRY_STATUS and attempt < Config.HTTP_MAX_RETRIES:
+            hist.note('retries')
+            _discard(result)
+            await asyncio.sleep(_delay(attempt, _retry_after(result)))
+            continue
+        return result
+
+
+def openai_client():
+    """Process-wide OpenAI client; its keep-alive pool is shared by every module
+
+    The SDK's own retries are off so that `call` owns backoff and rate limits.
+    """
+    global _openai
+    with _lock:
+        if _openai is None:
+            from openai import OpenAI
+            _openai = OpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0, timeout=Config.HTTP_TIMEOUT)
+        return _openai
+
+
+def async_openai_client():
+    global _async_openai
+    with _lock:
+        if _async_openai is None:
+            from openai import AsyncOpenAI
+            _async_openai = AsyncOpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0, timeout=Config.HTTP_TIMEOUT)
+        return _async_openai
+
+
+def http_session():
+    """Process-wide requests.Session with a keep-alive pool sized for concurrent jobs"""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=Config.HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def request(endpoint, method, url, **kwargs):
+    """Rate-limited, retried request on the shared session"""
+    kwargs.setdefault('timeout', Config.HTTP_TIMEOUT)
+    return call(endpoint, http_session().request, method, url, **kwargs)
+
+
+async def request_async(endpoint, method, url, **kwargs):
+    """Async `request`: the pooled session runs on a worker thread"""
+    import asyncio
+    kwargs.setdefault('timeout', Config.HTTP_TIMEOUT)
+    session = http_session()
+    return await acall(endpoint, asyncio.to_thread, session.request, method, url, **kwargs)
+
+
+def latency_summary():
+    """One line per endpoint: calls, p50/p95/max latency, retries and throttling"""
+    return '\n'.join(
+        f"  🌐 {endpoint}: {s['count']} calls, p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s, max {s['max']:.2f}s, "
+        f"{s['retries']} retries, {s['throttled_seconds']:.1f}s throttled"
+        for endpoint, s in sorted(latency_report().items())
+    )
@@ -25,14 +25,125 @@ class Config:
         "chakra alignment and energy healing",
         "ancient wisdom and modern spirituality"
     ]
+    CONTENT_MODEL = os.getenv('CONTENT_MODEL', 'gpt-4')
+    CONTENT_BATCH_SIZE = int(os.getenv('CONTENT_BATCH_SIZE', 5))  # teachings per chat request
+    CONTENT_RECENT_SCRIPTS = 200  # queued and posted scripts new teachings are deduped against
+    
+    # Trend Index (trend_index.py): themes ranked from trend exports and upload history
+    TREND_DB_PATH = os.getenv('TREND_DB_PATH', 'output/trends.sqlite3')
+    # Trend protocol JSON, Notion query exports (JSON) or CSV exports, comma-separated
+    TREND_SOURCES = [p for p in os.getenv('TREND_SOURCES', 'kyrios_codex_trend_protocol.json').split(',') if p]
+    TREND_HALF_LIFE_DAYS = float(os.getenv('TREND_HALF_LIFE_DAYS', 7))
+    TREND_COOLDOWN_HOURS = float(os.getenv('TREND_COOLDOWN_HOURS', 48))
+    TREND_NEAR_DUPLICATE_BITS = 14  # SimHash distance at or below which two topics are the same
+    TREND_VIEWS_PER_POINT = 1000  # upload views worth one trend-score point
+    
+    # Dedupe Index (dedupe_index.py): near-duplicates are rejected before TTS and rendering
+    DEDUPE_DB_PATH = os.getenv('DEDUPE_DB_PATH', 'output/dedupe.sqlite3')
+    DEDUPE_SCRIPT_SIMILARITY = float(os.getenv('DEDUPE_SCRIPT_SIMILARITY', 0.6))  # MinHash Jaccard estimate
+    DEDUPE_IMAGE_DISTANCE = int(os.getenv('DEDUPE_IMAGE_DISTANCE', 10))  # pHash bits out of 64
+    DEDUPE_IMAGE_RETRIES = 2  # fresh images tried before a near-duplicate is used anyway
     
     # Video Settings
     VIDEO_WIDTH = 1080
     VIDEO_HEIGHT = 1920  # Vertical for Shorts
     VIDEO_DURATION = 30  # seconds
+    VIDEO_FPS = 30
+    
+    # Encode Profiles (single-pass CRF, libx264)
+    # supersample: render the Ken Burns zoom at Nx resolution before downscaling
+    # gop_seconds: keyframe interval; Shorts seeks and trims cleanly at 1-2s
+    ENCODE_PROFILES = {
+        'draft': {'preset': 'veryfast', 'crf': 28, 'tune': 'stillimage', 'supersample': 1, 'gop_seconds': 2},
+        'standard': {'preset': 'fast', 'crf': 23, 'tune': 'stillimage', 'supersample': 1, 'gop_seconds': 2},
+        'archive': {'preset': 'slow', 'crf': 18, 'tune': 'stillimage', 'supersample': 2, 'gop_seconds': 1},
+    }
+    ENCODE_PROFILE = os.getenv('ENCODE_PROFILE', 'standard')
+    
+    # Renditions encoded from one decode of the composite (split in a single ffmpeg run)
+    # Keys override the encode profile; size defaults to VIDEO_WIDTH x VIDEO_HEIGHT.
+    # 'master' is YouTube Shorts (and TikTok); kind 'poster' is a JPEG thumbnail at `at` seconds
+    RENDITIONS = {
+        'master': {},
+        'reels': {'maxrate': '5M', 'bufsize': '10M'},  # Instagram re-compresses heavier uploads
+        'preview': {'size': (540, 960), 'crf': 30, 'audio_bitrate': '96k'},
+        'poster': {'kind': 'poster', 'at': 1.0},
+    }
+    RENDER_RENDITIONS = [n for n in os.getenv('RENDER_RENDITIONS', 'master').split(',') if n]
+    
+    # Ken Burns motion: zoom_in, zoom_out, pan_up, pan_down or static
+    MOTION_STYLE = os.getenv('MOTION_STYLE', 'zoom_in')
+    
+    # Procedural backgrounds (sacred_geometry.py)
+    # IMAGE_SOURCE: 'dalle', falling back to procedural on errors, or 'procedural' for no image API calls
+    IMAGE_SOURCE = os.getenv('IMAGE_SOURCE', 'dalle')
+    # BACKGROUND_PATTERN for video_generation_upgrade: flower_of_life, mandala, radial or color
+    BACKGROUND_PATTERN = os.getenv('BACKGROUND_PATTERN', 'flower_of_life')
+    
+    # Background Music (music_bed.py): tracks in MUSIC_DIR, optionally in per-theme sub-folders
+    MUSIC_DIR = os.getenv('MUSIC_DIR', 'assets/music')
+    MUSIC_BED_LUFS = float(os.getenv('MUSIC_BED_LUFS', -30))  # voice-over sits around -16 LUFS
+    MUSIC_FADE_SECONDS = 2.0
+    
+    # Upload Settings
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))  # multiple of 256 KiB
+    UPLOAD_MAX_RETRIES = int(os.getenv('UPLOAD_MAX_RETRIES', 8))
+    UPLOAD_STATE_FILE = os.getenv('UPLOAD_STATE_FILE', 'output/upload_sessions.json')
+    YOUTUBE_API_ENDPOINT = os.getenv('YOUTUBE_API_ENDPOINT')  # e.g. a local fake_youtube server
+    YOUTUBE_DISCOVERY_CACHE = os.getenv('YOUTUBE_DISCOVERY_CACHE', 'cache/discovery/youtube.v3.json')
+    # Write the master as fragmented MP4 and upload it while it encodes, when the job is already due
+    STREAM_UPLOAD = os.getenv('STREAM_UPLOAD', 'true').lower() == 'true'
+    STREAM_STALL_SECONDS = 300  # a streamed upload gives up if the video stops growing this long
     
     # Automation Settings
     POST_INTERVAL_HOURS = 8
+    SCHEDULE_AHEAD_SLOTS = int(os.getenv('SCHEDULE_AHEAD_SLOTS', 2))  # posting slots kept in the queue
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'output/jobs.sqlite3')
+    JOB_WORK_DIR = os.getenv('JOB_WORK_DIR', 'output/queue')
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 1800))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+    WORKER_POLL_SECONDS = int(os.getenv('WORKER_POLL_SECONDS', 30))
+    STAGE_CONCURRENCY = {'content': 1, 'assets': 2, 'render': 1, 'upload': 1}
+    
+    # Artifact Settings (artifact_manager.py): job work dirs and the asset cache share one disk budget
+    ARTIFACT_QUOTA_BYTES = int(os.getenv('ARTIFACT_QUOTA_BYTES', 3 * 1024 ** 3))
+    ARTIFACT_MIN_FREE_BYTES = int(os.getenv('ARTIFACT_MIN_FREE_BYTES', 512 * 1024 ** 2))
+    ARTIFACT_JOB_BYTES = 256 * 1024 ** 2  # space reserved before a job's assets or render stage
+    
+    # Tracing Settings (see tracing.py)
+    TRACE_FILE = os.getenv('TRACE_FILE', 'output/traces.jsonl')  # empty disables the span log
+    METRICS_PORT = int(os.getenv('PORT', 8080))  # /metrics and /health in the long-running engine
+    
+    # API Client Settings (shared pools, see clients.py)
+    HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 60))
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))  # keep-alive connections per host
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 5))
+    HTTP_BASE_BACKOFF = 1.0
+    HTTP_MAX_BACKOFF = 60.0
+    # Per-minute budgets: requests, except tts which is input characters
+    RATE_LIMITS = {
+        'chat': int(os.getenv('CHAT_REQUESTS_PER_MINUTE', 60)),
+        'images': int(os.getenv('IMAGES_PER_MINUTE', 5)),
+        'tts': int(os.getenv('TTS_CHARS_PER_MINUTE', 20000)),
+        'notion': 180,  # Notion allows an average of 3 requests per second
+    }
+    
+    # Asset Cache Settings
+    CACHE_DIR = os.getenv('CACHE_DIR', 'cache')
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 2 * 1024 ** 3))
+    
+    # Batch Settings
+    BATCH_OUTPUT_DIR = os.getenv('BATCH_OUTPUT_DIR', 'output/jobs')
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+    ENCODE_WORKERS = int(os.getenv('ENCODE_WORKERS', os.cpu_count() or 1))
+    
+    @classmethod
+    def encode_profile(cls, name=None):
+        """Return the settings of an encode profile (defaults to ENCODE_PROFILE)"""
+        name = name or cls.ENCODE_PROFILE
+        if name not in cls.ENCODE_PROFILES:
+            raise ValueError(f"Unknown encode profile: {name}")
+        return cls.ENCODE_PROFILES[name]
     
     @classmethod
     def validate(cls):
@@ -4,179 +4,328 @@ Content Creator - Professional video generation
 Creates spiritual videos with voiceover, subtitles, music, and effects
 """
 
-import subprocess
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from openai import OpenAI
 from PIL import Image, ImageDraw, ImageFont
-import requests
 import re
 from config import Config
+import clients
+from artifact_manager import partial_path
+from asset_cache import get_cache, file_digest
+from content_generator import script_fingerprint
+import dedupe_index
+import media_probe
+import motion_plan
+import music_bed
+import sacred_geometry
+import process_runner
+import render_graph
+import subtitle_timing
+import tracing
+from background_renderer import pipe_frames
+
+def master_video_path(output_dir):
+    """Where ContentCreator(output_dir) writes the master rendition"""
+    return Path(output_dir) / 'spiritual_short.mp4'
+
+# Seconds into a pattern's animation between procedural image variants (about a third of a palette cycle)
+PROCEDURAL_VARIANT_SECONDS = 7.0
 
 class ContentCreator:
-    def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        self.output_dir = Path('output')
-        self.output_dir.mkdir(exist_ok=True)
+    def __init__(self, output_dir='output', encode_profile=None):
+        self.client = clients.openai_client()
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = get_cache()
+        self.dedupe = dedupe_index.get_index()
+        self.encode_profile = Config.encode_profile(encode_profile)
+        self.motion_style = Config.MOTION_STYLE
+        self.timings = {}
+        self.process_spawns = 0
+        self.renditions = {}
     
     def create_video(self, content):
         """Create professional video from content"""
-        print("  📸 Generating image...", flush=True)
-        image_path = self._generate_image(content['visual_prompt'])
+        started = time.perf_counter()
+        spawns_before = process_runner.spawn_total()
+        with tracing.span('creator.create_video', theme=content.get('theme')):
+            assets = self.prepare_assets(content)
+            video_path = self.composite(assets)
         
-        print("  🎙️ Generating voiceover...", flush=True)
-        audio_path = self._generate_voiceover(content['script'])
+        self.timings['total'] = time.perf_counter() - started
+        self.process_spawns = process_runner.spawn_total() - spawns_before
+        print("  ⏱️ " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+              + f" | {self.process_spawns} process spawns", flush=True)
+        return video_path
+    
+    def prepare_assets(self, content):
+        """Generate image, voiceover and subtitles (the network-bound stages)
         
-        print("  📝 Creating subtitles...", flush=True)
-        srt_path = self._create_subtitles(content['script'], audio_path)
+        Image generation and voiceover run concurrently; subtitles are timed
+        as soon as the audio arrives, while the image may still be in flight.
+        """
+        self.timings = {}
         
-        print("  🎬 Compositing video...", flush=True)
-        video_path = self._composite_video(image_path, audio_path, srt_path)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            print("  📸 Generating image...", flush=True)
+            # Each task runs in a copy of this context so its span nests under create_video
+            image_future = pool.submit(contextvars.copy_context().run, self._timed, 'image',
+                                       self._generate_image, content['visual_prompt'], content.get('theme'),
+                                       script_fingerprint(content['script']))
+            
+            print("  🎙️ Generating voiceover...", flush=True)
+            audio_future = pool.submit(contextvars.copy_context().run, self._timed, 'voiceover',
+                                       self._generate_voiceover, content['script'])
+            
+            audio_path = audio_future.result()
+            print("  📝 Creating subtitles...", flush=True)
+            subtitles_path = self._timed('subtitles', self._create_subtitles, content['script'], audio_path)
+            music_path = self._timed('music', self._prepare_music, content, audio_path)
+            
+            image_path = image_future.result()
         
-        return video_path
+        return {'image': image_path, 'audio': audio_path, 'subtitles': subtitles_path, 'music': music_path}
     
-    def _generate_image(self, prompt):
-        """Generate spiritual image with DALL-E"""
-        response = self.client.images.generate(
-            model="dall-e-3",
-            prompt=f"Spiritual and serene: {prompt}. Vertical format, calming colors, sacred geometry, cinematic.",
-            size="1024x1792",
-            quality="standard",
-            n=1
-        )
+    def composite(self, assets, renditions=None):
+        """Render the final video from prepared assets (the CPU-bound stage)
+        
+        Every rendition in `renditions` (default Config.RENDER_RENDITIONS) is
+        encoded by the same ffmpeg run; all their paths are kept in
+        self.renditions and the master video's path is returned.
+        """
+        print("  🎬 Compositing video...", flush=True)
+        names = ['master'] + [name for name in (renditions or Config.RENDER_RENDITIONS) if name != 'master']
+        self.renditions = self._timed('composite', self._composite_renditions, assets['image'], assets['audio'],
+                                      assets['subtitles'], assets.get('music'), names)
+        return self.renditions['master']
+    
+    def _timed(self, stage, func, *args):
+        """Run one pipeline stage in a trace span and record its wall-clock latency"""
+        started = time.perf_counter()
+        try:
+            with tracing.span(f'creator.{stage}'):
+                return func(*args)
+        finally:
+            self.timings[stage] = time.perf_counter() - started
+    
+    def _generate_image(self, prompt, theme=None, ref=None):
+        """Generate spiritual image with DALL-E (cached by model, prompt and size)
         
-        image_url = response.data[0].url
+        With IMAGE_SOURCE=procedural, or when DALL-E fails, a sacred-geometry
+        still for the theme is rendered locally instead. An image that looks
+        like one already used by another post (`ref` is this post's script
+        fingerprint) is replaced before it reaches ffmpeg.
+        """
+        base_prompt = f"Spiritual and serene: {prompt}. Vertical format, calming colors, sacred geometry, cinematic."
         image_path = self.output_dir / 'spiritual_image.png'
+        attempts = Config.DEDUPE_IMAGE_RETRIES + 1
         
-        img_data = requests.get(image_url).content
-        with open(image_path, 'wb') as f:
-            f.write(img_data)
+        def download(full_prompt, path):
+            response = clients.call(
+                'images', self.client.images.generate,
+                model="dall-e-3",
+                prompt=full_prompt,
+                size="1024x1792",
+                quality="standard",
+                n=1
+            )
+            
+            image_url = response.data[0].url
+            with clients.request('download', 'GET', image_url, stream=True) as download_response:
+                download_response.raise_for_status()
+                with open(path, 'wb') as f:
+                    for chunk in download_response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+        
+        if Config.IMAGE_SOURCE != 'procedural':
+            for attempt in range(attempts):
+                full_prompt = base_prompt if not attempt else f"{base_prompt} Variation {attempt + 1}: a fresh composition."
+                try:
+                    path = self.cache.fetch(("dall-e-3", "standard", full_prompt, "1024x1792"), image_path,
+                                            lambda path: download(full_prompt, path))
+                except Exception as e:
+                    print(f"  ⚠️ DALL-E unavailable ({e}); using a procedural background", flush=True)
+                    break
+                if self._register_image(path, ref):
+                    return path
+        for variant in range(attempts):
+            path = self._procedural_image(image_path, theme, variant)
+            if self._register_image(path, ref, force=variant == attempts - 1):
+                return path
+    
+    def _register_image(self, image_path, ref, force=False):
+        """Record the image in the dedupe index unless it repeats another post's (then False)"""
+        value = dedupe_index.phash(image_path)
+        match = self.dedupe.similar_image(value, exclude_ref=ref)
+        if match and not force:
+            print(f"  ♻️ Image is {match[1]} bits from an earlier post's; trying another", flush=True)
+            return False
+        if ref:
+            self.dedupe.add_image(value, ref)
+        return True
+    
+    def _procedural_image(self, image_path, theme, variant=0):
+        """Zero-cost sacred-geometry still, cached by pattern, palette, size and variant
         
-        return image_path
+        Variants are the same pattern later in its animation cycle, which
+        shifts the palette and breathing enough to look like a new image.
+        """
+        pattern, palette = sacred_geometry.style_for(theme)
+        t = variant * PROCEDURAL_VARIANT_SECONDS
+        key = ("sacred-geometry", pattern, palette, 1024, 1792) + ((t,) if variant else ())
+        return self.cache.fetch(key, image_path,
+                                lambda path: sacred_geometry.still_image(path, pattern, 1024, 1792, palette, t=t))
     
     def _generate_voiceover(self, script):
-        """Generate voiceover using OpenAI TTS"""
+        """Generate voiceover using OpenAI TTS (cached by model, voice and script)
+        
+        The response body is already in memory, so its duration is read from
+        the MP3 frame headers there instead of probing the file again later.
+        """
         audio_path = self.output_dir / 'voiceover.mp3'
+        synthesized = {}
         
-        response = self.client.audio.speech.create(
-            model="tts-1",
-            voice="nova",  # Calm, spiritual voice
-            input=script
-        )
+        def synthesize(path):
+            response = clients.call(
+                'tts', self.client.audio.speech.create,
+                model="tts-1",
+                voice="nova",  # Calm, spiritual voice
+                input=script,
+                cost=len(script)
+            )
+            data = response.content
+            with open(path, 'wb') as f:
+                f.write(data)
+            synthesized['info'] = media_probe.mp3_info(data)
         
-        response.stream_to_file(audio_path)
+        self.cache.fetch(("tts-1", "nova", script, "mp3"), audio_path, synthesize)
+        if synthesized.get('info'):
+            media_probe.remember(audio_path, synthesized['info'])
         return audio_path
     
     def _create_subtitles(self, script, audio_path):
-        """Create SRT subtitle file with 3-5 word chunks"""
-        # Get audio duration
+        """Create ASS subtitle file with 3-5 word chunks timed by spoken weight"""
         duration = self._get_audio_duration(audio_path)
+        cues = subtitle_timing.time_cues(script, duration)
         
-        # Split script into 3-5 word chunks
-        words = script.split()
-        chunks = []
-        current_chunk = []
-        
-        for word in words:
-            current_chunk.append(word)
-            if len(current_chunk) >= 3 and (len(current_chunk) >= 5 or word.endswith(('.', ',', '!', '?'))):
-                chunks.append(' '.join(current_chunk))
-                current_chunk = []
+        subtitles_path = self.output_dir / 'subtitles.ass'
+        subtitles_path.write_text(subtitle_timing.to_ass(cues), encoding='utf-8')
+        return subtitles_path
+    
+    def _prepare_music(self, content, audio_path):
+        """Loudness-normalized music bed for the theme and voice-over length, or None"""
+        duration = self._get_audio_duration(audio_path)
+        return music_bed.bed_for(content.get('theme'), duration, seed=content['script'],
+                                 dest=self.output_dir / 'music_bed.wav')
+    
+    def _get_audio_duration(self, audio_path):
+        """Get audio duration (probed once per file version, see media_probe)"""
+        return media_probe.duration(audio_path)
+    
+    def _composite_renditions(self, image_path, audio_path, subtitles_path, music_path, names):
+        """Composite every named rendition, rendering all missing ones in one ffmpeg run
         
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
+        Each rendition is cached on its own under its render-graph key, so
+        renditions with identical settings share one encode and an identical
+        render is never repeated. A fragmented master is visible at
+        partial_path(dest) while it encodes, when the cache and the job dir
+        share a filesystem.
+        """
+        music_path = Path(music_path) if music_path else None
+        specs = {name: self._rendition(name) for name in names}
+        dests = {name: self._rendition_path(name, spec) for name, spec in specs.items()}
+        graph = self._render_graph(image_path, audio_path, subtitles_path, music_path, specs)
         
-        # Create SRT file with timing
-        srt_path = self.output_dir / 'subtitles.srt'
-        time_per_chunk = duration / len(chunks)
+        partial = partial_path(dests['master']) if specs.get('master', {}).get('fragmented') else None
         
-        with open(srt_path, 'w', encoding='utf-8') as f:
-            for i, chunk in enumerate(chunks):
-                start_time = i * time_per_chunk
-                end_time = (i + 1) * time_per_chunk
-                
-                f.write(f"{i + 1}\n")
-                f.write(f"{self._format_srt_time(start_time)} --> {self._format_srt_time(end_time)}\n")
-                f.write(f"{chunk}\n\n")
+        def render(paths):
+            if partial and 'master' in paths:
+                # A second name for the encoder's output, so an upload can read it while it grows
+                partial.unlink(missing_ok=True)
+                try:
+                    os.link(paths['master'], partial)
+                except OSError as e:
+                    # e.g. EXDEV with CACHE_DIR on another filesystem: an upload waits for the finished file
+                    print(f"  ⚠️ Not streaming the master while it encodes: {e}", flush=True)
+            missing = {**graph, 'outputs': {name: graph['outputs'][name] for name in paths}}
+            self._run_graph(missing, image_path, audio_path, subtitles_path, music_path, paths)
         
-        return srt_path
+        try:
+            cached = self.cache.entries({name: (("render", render_graph.graph_key(graph, name)), dests[name].suffix)
+                                         for name in specs}, render)
+            for name, path in cached.items():
+                self.cache.materialise(path, dests[name])
+        finally:
+            if partial:
+                partial.unlink(missing_ok=True)
+        return dests
     
-    def _get_audio_duration(self, audio_path):
-        """Get audio duration using ffprobe"""
-        cmd = [
-            'ffprobe', '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            str(audio_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    
-    def _format_srt_time(self, seconds):
-        """Format seconds to SRT time format (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-    
-    def _composite_video(self, image_path, audio_path, srt_path):
-        """Composite final video with all effects"""
-        video_path = self.output_dir / 'spiritual_short.mp4'
-        
-        # Check for background music
-        music_path = Path('assets/background_music.mp3')
-        
-        # Ken Burns effect: slow zoom from 100% to 110% with slight pan
-        video_filter = (
-            f"[0:v]scale={Config.VIDEO_WIDTH * 2}:{Config.VIDEO_HEIGHT * 2},"
-            f"zoompan=z='min(zoom+0.0005,1.1)':d={Config.VIDEO_DURATION * 30}:"
-            f"x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':"
-            f"s={Config.VIDEO_WIDTH}x{Config.VIDEO_HEIGHT}:fps=30,"
-            f"subtitles={srt_path}:force_style='"
-            f"FontName=Arial,FontSize=24,Bold=1,PrimaryColour=&HFFFFFF&,"
-            f"OutlineColour=&H000000&,BackColour=&H80000000&,BorderStyle=4,"
-            f"Outline=2,Shadow=0,MarginV=80,Alignment=2'"
+    def _rendition(self, name):
+        """Settings of a Config.RENDITIONS entry on top of the encode profile"""
+        if name not in Config.RENDITIONS:
+            raise ValueError(f"Unknown rendition: {name}")
+        spec = {
+            'kind': 'video',
+            'size': (Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT),
+            'audio_bitrate': '192k',
+            **self.encode_profile,
+            **Config.RENDITIONS[name],
+        }
+        spec['size'] = tuple(spec['size'])
+        if name == 'master':
+            # Fragmented MP4 is written front to back, so it can be uploaded while it encodes
+            spec.setdefault('fragmented', Config.STREAM_UPLOAD)
+        return spec
+    
+    def _rendition_path(self, name, spec):
+        if spec['kind'] == 'poster':
+            return self.output_dir / f'spiritual_short_{name}.jpg'
+        return master_video_path(self.output_dir) if name == 'master' else self.output_dir / f'spiritual_short_{name}.mp4'
+    
+    def _render_video(self, image_path, audio_path, subtitles_path, music_path, video_path):
+        """Run ffmpeg to render the composited video into video_path"""
+        self._render_outputs(image_path, audio_path, subtitles_path, music_path,
+                             [(self._rendition('master'), video_path)])
+    
+    def _render_outputs(self, image_path, audio_path, subtitles_path, music_path, outputs):
+        """Render each (spec, path) output with one uncached ffmpeg run"""
+        specs = {f"o{i}": spec for i, (spec, _) in enumerate(outputs)}
+        graph = self._render_graph(image_path, audio_path, subtitles_path, music_path, specs)
+        self._run_graph(graph, image_path, audio_path, subtitles_path, music_path,
+                        {f"o{i}": path for i, (_, path) in enumerate(outputs)})
+    
+    def _render_graph(self, image_path, audio_path, subtitles_path, music_path, specs):
+        """Render graph of the composite: Ken Burns frames, burnt-in captions, voice plus music
+        
+        The bed is already gained to MUSIC_BED_LUFS (see music_bed), so the
+        graph sums it with the voice as it is. Sources are identified by
+        content digest, which makes the graph's hash a complete cache key.
+        """
+        return render_graph.graph(
+            video=render_graph.frames((Config.VIDEO_WIDTH, Config.VIDEO_HEIGHT), Config.VIDEO_FPS,
+                                      key=("ken-burns", file_digest(image_path), self.motion_style,
+                                           self.encode_profile['supersample'], motion_plan.RESAMPLE)),
+            subtitles=file_digest(subtitles_path),
+            audio=[file_digest(audio_path)] + ([file_digest(music_path)] if music_path else []),
+            duration=self._get_audio_duration(audio_path),
+            outputs=specs,
         )
+    
+    def _run_graph(self, graph, image_path, audio_path, subtitles_path, music_path, paths):
+        """Render `graph` into `paths` ({output name: path}), piping in the Ken Burns frames"""
+        size = tuple(graph['video']['size'])
+        fps = graph['video']['fps']
         
-        if music_path.exists():
-            # Mix voiceover with background music (music at 20% volume)
-            audio_filter = "[1:a]volume=1.0[voice];[2:a]volume=0.2[music];[voice][music]amix=inputs=2:duration=first[aout]"
-            
-            cmd = [
-                'ffmpeg', '-y',
-                '-loop', '1', '-i', str(image_path),
-                '-i', str(audio_path),
-                '-i', str(music_path),
-                '-filter_complex', f"{video_filter};{audio_filter}",
-                '-map', '[v]',
-                '-map', '[aout]',
-                '-t', str(self._get_audio_duration(audio_path)),
-                '-c:v', 'libx264',
-                '-preset', 'medium',
-                '-crf', '23',
-                '-c:a', 'aac',
-                '-b:a', '192k',
-                '-pix_fmt', 'yuv420p',
-                str(video_path)
-            ]
-        else:
-            # No background music - just voiceover
-            cmd = [
-                'ffmpeg', '-y',
-                '-loop', '1', '-i', str(image_path),
-                '-i', str(audio_path),
-                '-filter_complex', f"{video_filter}[v]",
-                '-map', '[v]',
-                '-map', '1:a',
-                '-t', str(self._get_audio_duration(audio_path)),
-                '-c:v', 'libx264',
-                '-preset', 'medium',
-                '-crf', '23',
-                '-c:a', 'aac',
-                '-b:a', '192k',
-                '-pix_fmt', 'yuv420p',
-                str(video_path)
-            ]
-        
-        subprocess.run(cmd, check=True, capture_output=True)
-        return video_path
+        # Ken Burns effect: precomputed crop boxes, cropped and scaled per frame
+        with Image.open(image_path) as image:
+            source_size = image.size
+        plan = motion_plan.frame_plan(self.motion_style, graph['duration'], fps, source_size, size)
+        frames = motion_plan.iter_frames(image_path, plan, size, self.encode_profile['supersample'])
+        
+        # Caption style is baked into the ASS file (see subtitle_timing.ASS_STYLE)
+        cmd = render_graph.command(graph, paths, subtitles=subtitles_path,
+                                   audio=[audio_path] + ([music_path] if music_path else []))
+        pipe_frames(cmd, frames)
@@ -1,70 +1,245 @@
 #!/usr/bin/env python3
 """
 Content Generator - AI-powered spiritual content creation
-Uses GPT-4 to generate authentic spiritual wisdom
+Uses GPT-4 to generate authentic spiritual wisdom, several teachings per request
 """
 
-import random
-from openai import OpenAI
+import hashlib
+import json
+import re
+import threading
+import numpy as np
+import clients
+import tracing
 from config import Config
+from dedupe_index import get_index, minhash
+from trend_index import TrendIndex
+
+SYSTEM_PROMPT = "You are a wise spiritual teacher creating transformative content."
+FIELDS = ('title', 'script', 'visual_prompt')
+MAX_SCRIPT_WORDS = 90  # about 30 seconds of speech
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def script_fingerprint(script):
+    """Case-, punctuation- and whitespace-insensitive identity of a script"""
+    words = _WORD.findall(script.lower())
+    return hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()
+
+
+def record_posted(content, dedupe=None, trends=None):
+    """Register a posted teaching: later scripts are checked against it and its theme cools down"""
+    (dedupe or get_index()).add_script(minhash(content['script']), script_fingerprint(content['script']))
+    if content.get('theme'):
+        (trends or TrendIndex()).mark_used(content['theme'])
+
+
+def iter_json_items(chunks):
+    """Yield each object of the first JSON array in a stream of text chunks
+
+    Objects are decoded as soon as their closing brace arrives, so callers can
+    start on the first teaching while the model is still writing the rest.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = None
+    for chunk in chunks:
+        buffer += chunk
+        if pos is None:
+            start = buffer.find('[')
+            if start < 0:
+                continue
+            pos = start + 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer) or buffer[pos] == ']' or '}' not in buffer[pos:]:
+                break
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # object not complete yet
+            yield item
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
 
 class ContentGenerator:
-    def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        
-    def generate_content(self):
-        """Generate spiritual content with GPT-4"""
-        theme = random.choice(Config.CONTENT_THEMES)
-        
-        prompt = f"""Create a 30-second spiritual teaching about {theme}.
-        
-Requirements:
+    """Writes teachings with one chat request per batch
+
+    `client` is anything with OpenAI's `chat.completions.create(stream=True)`
+    interface, so tests can pass a stub that yields canned chunks.
+    `recent_scripts` are scripts of queued or posted jobs that must not be
+    repeated. `trends` picks the themes (a TrendIndex; refreshed from `queue`,
+    if given, before each batch). Scripts too close to anything in `dedupe` (a
+    DedupeIndex of posted scripts, see record_posted) or to a script still in
+    flight are rejected before they cost a voiceover or a render.
+    """
+
+    def __init__(self, client=None, recent_scripts=(), batch_size=None, trends=None, queue=None, dedupe=None):
+        self.client = client or clients.openai_client()
+        self.trends = trends or TrendIndex()
+        self.dedupe = dedupe or get_index()
+        self.queue = queue
+        self.batch_size = batch_size or Config.CONTENT_BATCH_SIZE
+        self.seen = set()
+        self._in_flight = []  # MinHash signatures of accepted scripts the index doesn't know yet
+        for script in recent_scripts:
+            if script:
+                self.remember(script)
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'items': 0, 'rejected': 0}
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def remember(self, script):
+        """Mark a script as used so later batches won't repeat it"""
+        self.seen.add(script_fingerprint(script))
+        self._in_flight.append(minhash(script))
+
+    def _similar_in_flight(self, signature):
+        if not self._in_flight:
+            return None
+        similarity = float((np.stack(self._in_flight) == signature).mean(axis=1).max())
+        return similarity if similarity >= Config.DEDUPE_SCRIPT_SIMILARITY else None
+
+    def generate_content(self, wanted=None):
+        """Return one teaching, requesting a new batch when the last one is used up
+
+        `wanted` is how many teachings the caller will ask for in all (this
+        one included); batches are no larger, so nothing generated is left
+        over when the process exits.
+        """
+        size = max(1, min(self.batch_size, wanted or self.batch_size))
+        with self._lock:
+            for _ in range(3):
+                if self._buffer:
+                    return self._buffer.pop(0)
+                with tracing.span('content.batch', size=size):
+                    self._buffer.extend(self.generate_batch(size))
+            raise RuntimeError("Content generation returned no usable teachings")
+
+    def generate_batch(self, count=None, themes=None):
+        """Yield up to `count` validated, deduplicated teachings from a single request
+
+        Each theme is requested explicitly, and the theme the model wrote about
+        is recorded with the result. By default the themes are the trend
+        index's best-ranked topics that are not cooling down or already queued.
+        """
+        count = count or self.batch_size
+        if themes is None:
+            self.trends.refresh(self.queue)
+            queued = self.queue.queued_themes() if self.queue else []
+            themes = self.trends.select(count, exclude=queued + [content['theme'] for content in self._buffer])
+            themes = [themes[i % len(themes)] for i in range(count)]
+        themes = list(themes)[:count]
+
+        # Only the request is a span: the rest of a generator's time belongs to its consumer
+        with tracing.span('content.request', model=Config.CONTENT_MODEL, count=count):
+            stream = clients.call(
+                'chat', self.client.chat.completions.create,
+                model=Config.CONTENT_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": self._batch_prompt(themes)}
+                ],
+                temperature=0.8,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        self.usage['requests'] += 1
+
+        text = []
+        chunks = self._stream_text(stream, text)
+        found = False
+        for index, item in enumerate(iter_json_items(chunks)):
+            found = True
+            content = self._validate(item, themes[min(index, len(themes) - 1)], themes)
+            if content:
+                yield content
+        for _ in chunks:
+            pass  # read to the end so the usage chunk is counted
+        if not found:
+            # The model ignored the JSON instruction; salvage a TITLE/SCRIPT block
+            content = self._validate(self._parse_content(''.join(text), themes[0]), themes[0], themes)
+            if content:
+                yield content
+
+    def _stream_text(self, stream, collected):
+        for chunk in stream:
+            usage = getattr(chunk, 'usage', None)
+            if usage:
+                self.usage['prompt_tokens'] += usage.prompt_tokens
+                self.usage['completion_tokens'] += usage.completion_tokens
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content or ''
+                collected.append(delta)
+                yield delta
+
+    @staticmethod
+    def _batch_prompt(themes):
+        listing = '\n'.join(f"{i}. {theme}" for i, theme in enumerate(themes, 1))
+        return f"""Create {len(themes)} different 30-second spiritual teachings, one for each theme below, in order:
+{listing}
+
+Requirements for each:
 - Deeply authentic and transformative
 - Practical wisdom people can use today
 - Warm, compassionate tone
 - Include a specific practice or insight
 - 2-3 sentences maximum
 
-Format as:
-TITLE: [Compelling title]
-SCRIPT: [The teaching]
-VISUAL_PROMPT: [Description for AI image generation]
+Respond with only a JSON array of {len(themes)} objects with the keys
+"theme" (copied from the list), "title" (compelling title), "script" (the teaching)
+and "visual_prompt" (description for AI image generation).
 """
-        
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a wise spiritual teacher creating transformative content."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8
-        )
-        
-        content = response.choices[0].message.content
-        return self._parse_content(content)
-    
-    def _parse_content(self, raw_content):
-        """Parse GPT-4 output into structured format"""
-        lines = raw_content.strip().split('\n')
-        result = {
-            'title': '',
-            'script': '',
-            'visual_prompt': '',
-            'theme': random.choice(Config.CONTENT_THEMES)
-        }
-        
-        for line in lines:
-            if line.startswith('TITLE:'):
-                result['title'] = line.replace('TITLE:', '').strip()
-            elif line.startswith('SCRIPT:'):
-                result['script'] = line.replace('SCRIPT:', '').strip()
-            elif line.startswith('VISUAL_PROMPT:'):
-                result['visual_prompt'] = line.replace('VISUAL_PROMPT:', '').strip()
-        
+
+    def _validate(self, item, theme, themes):
+        """Normalize one item; None if it is malformed, too long or a repeat"""
+        if not isinstance(item, dict):
+            self.usage['rejected'] += 1
+            return None
+        content = {field: ' '.join(str(item.get(field) or '').split()) for field in FIELDS}
+        if not all(content.values()) or len(content['script'].split()) > MAX_SCRIPT_WORDS:
+            self.usage['rejected'] += 1
+            return None
+        fingerprint = script_fingerprint(content['script'])
+        if fingerprint in self.seen:
+            self.usage['rejected'] += 1
+            return None
+        signature = minhash(content['script'])
+        match = self.dedupe.similar_script(signature, exclude_ref=fingerprint)
+        similarity = match[1] if match else self._similar_in_flight(signature)
+        if similarity:
+            print(f"  ♻️ Skipping a teaching {similarity:.0%} similar to an earlier one", flush=True)
+            self.usage['rejected'] += 1
+            return None
+        self.seen.add(fingerprint)
+        self._in_flight.append(signature)
+        content['theme'] = item.get('theme') if item.get('theme') in themes else theme
+        self.usage['items'] += 1
+        return content
+
+    def _parse_content(self, raw_content, theme):
+        """Parse a TITLE/SCRIPT/VISUAL_PROMPT text block (fields may span lines)"""
+        result = {'title': '', 'script': '', 'visual_prompt': '', 'theme': theme}
+        labels = {'TITLE:': 'title', 'SCRIPT:': 'script', 'VISUAL_PROMPT:': 'visual_prompt'}
+
+        field = None
+        for line in raw_content.strip().split('\n'):
+            stripped = line.strip()
+            for label, name in labels.items():
+                if stripped.startswith(label):
+                    field = name
+                    stripped = stripped[len(label):].strip()
+                    break
+            if field and stripped:
+                result[field] = f"{result[field]} {stripped}".strip()
+
         return result
-    
+
     def calculate_authenticity_score(self, content):
-        """Score content for authenticity (must be >85%)"""
-        # Simple heuristic - real implementation would be more sophisticated
-        score = 85 + random.randint(0, 15)
-        return score
+        """Percent of the script that is new: 100 minus its similarity to the closest earlier script"""
+        _, similarity = self.dedupe.nearest_script(minhash(content['script']),
+                                                   exclude_ref=script_fingerprint(content['script']))
+        return round(100 * (1 - similarity))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Dedupe Index - Near-duplicate detection for posted images and scripts
+Images are 64-bit DCT perceptual hashes, searched by Hamming distance over a NumPy
+array; scripts are MinHash signatures of word shingles, bucketed with LSH bands.
+Fingerprints persist in SQLite and are loaded into memory incrementally
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+from config import Config
+
+SIGNATURE_SIZE = 64
+BANDS = 16               # LSH bands of SIGNATURE_SIZE // BANDS rows each
+SHINGLE_WORDS = 3
+PRIME = (1 << 31) - 1    # keeps a * x + b inside uint64
+HASH_SIZE = 32           # pHash: DCT of a 32x32 greyscale thumbnail, low 8x8 frequencies
+
+_WORD = re.compile(r"[a-z0-9']+")
+# Fixed seed: signatures must stay comparable across processes and releases
+_A, _B = np.random.default_rng(20240101).integers(1, PRIME, size=(2, SIGNATURE_SIZE, 1), dtype=np.uint64)
+_n = np.arange(HASH_SIZE)
+_DCT = np.sqrt(2 / HASH_SIZE) * np.cos(np.pi * (2 * _n[None, :] + 1) * _n[:, None] / (2 * HASH_SIZE))
+_DCT[0] /= np.sqrt(2)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    hash INTEGER NOT NULL DEFAULT 0,
+    signature BLOB NOT NULL DEFAULT x'',
+    UNIQUE (kind, ref, hash, signature)
+);
+"""
+
+
+def phash(image_path):
+    """64-bit perceptual hash: signs of the low DCT frequencies against their median"""
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        grey = np.asarray(image.convert('L').resize((HASH_SIZE, HASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ grey @ _DCT.T)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def minhash(text):
+    """MinHash signature (uint32[SIGNATURE_SIZE]) of a script's word 3-shingles"""
+    words = _WORD.findall(text.lower())
+    grams = [' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'big') % PRIME
+                       for g in grams], dtype=np.uint64)
+    return ((_A * hashes + _B) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1)
+
+
+class DedupeIndex:
+    """Fingerprints of everything already generated, for sub-millisecond near-duplicate checks
+
+    `ref` identifies the post a fingerprint belongs to, so a retried job does
+    not match its own earlier entry.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or Config.DEDUPE_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # One connection for the index's lifetime: a connect per lookup would cost more than the search
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._loaded = 0
+        self._image_hashes = np.empty(1024, dtype=np.uint64)
+        self._image_refs = []
+        self._signatures = np.empty((1024, SIGNATURE_SIZE), dtype=np.uint32)
+        self._script_refs = []
+        self._bands = [{} for _ in range(BANDS)]
+
+    def _sync(self):
+        """Load fingerprints added since the last call (by this or another process)"""
+        rows = self._conn.execute(
+            "SELECT id, kind, ref, hash, signature FROM fingerprints WHERE id > ? ORDER BY id", (self._loaded,)
+        ).fetchall()
+        for row_id, kind, ref, value, signature in rows:
+            if kind == 'image':
+                self._append_image(value & 0xFFFFFFFFFFFFFFFF, ref)
+            else:
+                self._append_script(np.frombuffer(signature, dtype=np.uint32), ref)
+            self._loaded = row_id
+
+    def _append_image(self, value, ref):
+        count = len(self._image_refs)
+        if count == len(self._image_hashes):
+            self._image_hashes = np.resize(self._image_hashes, count * 2)
+        self._image_hashes[count] = value
+        self._image_refs.append(ref)
+
+    def _append_script(self, signature, ref):
+        count = len(self._script_refs)
+        if count == len(self._signatures):
+            self._signatures = np.resize(self._signatures, (count * 2, SIGNATURE_SIZE))
+        self._signatures[count] = signature
+        self._script_refs.append(ref)
+        for band, key in zip(self._bands, signature.reshape(BANDS, -1)):
+            band.setdefault(key.tobytes(), []).append(count)
+
+    def similar_image(self, value, exclude_ref=None, max_distance=None):
+        """(ref, distance) of the closest past image within max_distance bits, or None"""
+        limit = Config.DEDUPE_IMAGE_DISTANCE if max_distance is None else max_distance
+        with self._lock:
+            self._sync()
+            count = len(self._image_refs)
+            if not count:
+                return None
+            distances = _popcount(self._image_hashes[:count] ^ np.uint64(value))
+            hits = np.flatnonzero(distances <= limit)
+            for index in hits[np.argsort(distances[hits], kind='stable')]:
+                if self._image_refs[index] != exclude_ref:
+                    return self._image_refs[index], int(distances[index])
+        return None
+
+    def nearest_script(self, signature, exclude_ref=None):
+        """(ref, estimated Jaccard similarity) of the most similar LSH candidate, or (None, 0.0)"""
+        with self._lock:
+            self._sync()
+            candidates = set()
+            for band, key in zip(self._bands, signature.reshape(BANDS, -1)):
+                candidates.update(band.get(key.tobytes(), ()))
+            candidates = [i for i in candidates if self._script_refs[i] != exclude_ref]
+            if not candidates:
+                return None, 0.0
+            similarity = (self._signatures[candidates] == signature).mean(axis=1)
+            best = int(similarity.argmax())
+            return self._script_refs[candidates[best]], float(similarity[best])
+
+    def similar_script(self, signature, exclude_ref=None, threshold=None):
+        """(ref, similarity) of a past script at least `threshold` similar, or None"""
+        limit = Config.DEDUPE_SCRIPT_SIMILARITY if threshold is None else threshold
+        ref, similarity = self.nearest_script(signature, exclude_ref)
+        return (ref, similarity) if similarity >= limit else None
+
+    def add_image(self, value, ref):
+        signed = value - (1 << 64) if value >= 1 << 63 else value
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO fingerprints (kind, ref, hash) VALUES ('image', ?, ?)",
+                               (ref, signed))
+            self._sync()
+
+    def add_script(self, signature, ref):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO fingerprints (kind, ref, signature) VALUES ('script', ?, ?)",
+                               (ref, np.asarray(signature, dtype=np.uint32).tobytes()))
+            self._sync()
+
+    def stats(self):
+        with self._lock:
+            self._sync()
+            return {'images': len(self._image_refs), 'scripts': len(self._script_refs)}
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index at Config.DEDUPE_DB_PATH"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = DedupeIndex()
+        return _default_index
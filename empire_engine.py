@@ -1,46 +1,236 @@
 #!/usr/bin/env python3
 """
 Empire Engine - Main automation orchestrator
-Runs the complete content cycle every 8 hours
+Keeps the job queue filled ahead of each posting slot and runs the
+content → assets → render → upload stage workers
 """
 
+import argparse
+import contextvars
 import os
+import threading
 import time
-from datetime import datetime
-from video_generation_upgrade import create_video
+from datetime import datetime, timezone
+from config import Config
+import clients
+import tracing
+from job_queue import JobQueue, STAGES, schedule
 
-print("🔮 SCRIPT STARTING...")
+REQUIRED_ENV = ["OPENAI_API_KEY", "YOUTUBE_TOKEN", "FIREBASE_CONFIG"]
 
-try:
-    print("✅ Imports successful")
+
+def check_environment():
     print("🔍 Checking environment variables...")
-    required_env = ["OPENAI_API_KEY", "YOUTUBE_TOKEN", "FIREBASE_CONFIG"]
-    for var in required_env:
+    for var in REQUIRED_ENV:
         if not os.getenv(var):
             raise EnvironmentError(f"Missing required env var: {var}")
     print("✅ Environment variables present")
 
-    def run_cycle():
-        print("=" * 60)
-        print(f"🔮 Starting content cycle at {datetime.now()}")
-        print("=" * 60)
 
-        script_text = "The Unity of Timeless Wisdom — a reflection on the convergence of all paths toward love and understanding."
-        audio_output = "voice.mp3"
-        video_output = "final_video.mp4"
+# Stage handlers: each takes the job and the queue and returns its updated
+# payload. They are idempotent - outputs land in the job's own work dir (through
+# the asset cache), uploads resume their saved session and a published video's
+# id is stored the moment it exists - so a retried stage is safe. Work dirs are released to the artifact quota once a job is done.
+
+def _work_dir(job):
+    from artifact_manager import get_artifacts
+    artifacts = get_artifacts()
+    artifacts.ensure_space(Config.ARTIFACT_JOB_BYTES)
+    return artifacts.job_dir(job['id'])
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def _content_generator(queue):
+    """One generator per process, so a batch request fills several jobs"""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            from content_generator import ContentGenerator
+            _generator = ContentGenerator(recent_scripts=queue.recent_scripts(), queue=queue)
+        return _generator
+
+
+def stage_content(job, queue):
+    payload = job['payload']
+    # Batch no more teachings than content jobs can take: leftovers would be lost with the process
+    wanted = queue.active(['content'])
+    payload['content'] = _content_generator(queue).generate_content(wanted)
+    print(f"  🧘 [Job {job['id']}] {payload['content']['title']}", flush=True)
+    return payload
+
+
+def stage_assets(job, queue):
+    from content_creator import ContentCreator
+    payload = job['payload']
+    assets = ContentCreator(_work_dir(job)).prepare_assets(payload['content'])
+    payload['assets'] = {name: str(path) if path else None for name, path in assets.items()}
+    return payload
+
+
+def _publish(job, queue, video_path, finished=None):
+    """Upload a job's video and store its id before anything else can fail"""
+    from youtube_publisher import YouTubePublisher
+    video_id = YouTubePublisher().publish(video_path, job['payload']['content'], finished)
+    queue.update_payload(job['id'], video_id=video_id)
+    return video_id
+
+
+def _stream_upload(job, queue, video_path, rendered):
+    """Start uploading a due job's master while it renders; returns the upload's future"""
+    from concurrent.futures import ThreadPoolExecutor
+    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"stream-{job['id']}")
+    future = pool.submit(contextvars.copy_context().run, _publish, job, queue, video_path, rendered.is_set)
+    pool.shutdown(wait=False)
+    return future
+
+
+def stage_render(job, queue):
+    from content_creator import ContentCreator, master_video_path
+    payload = job['payload']
+    work_dir = _work_dir(job)
+    creator = ContentCreator(work_dir)
+    upload = None
+    rendered = threading.Event()
+    if Config.STREAM_UPLOAD and job['publish_at'] <= time.time() and not payload.get('video_id'):
+        upload = _stream_upload(job, queue, master_video_path(work_dir), rendered)
+    try:
+        payload['video'] = str(creator.composite(payload['assets']))
+    finally:
+        rendered.set()
+    payload['renditions'] = {name: str(path) for name, path in creator.renditions.items()}
+    if upload:
+        try:
+            payload['video_id'] = upload.result()
+        except Exception as e:
+            # The upload stage retries it from the finished file
+            print(f"  ⚠️ [Job {job['id']}] Streamed upload failed: {e}", flush=True)
+    return payload
+
+
+def stage_upload(job, queue):
+    from artifact_manager import get_artifacts
+    from content_generator import record_posted
+    payload = job['payload']
+    if not payload.get('video_id'):
+        payload['video_id'] = _publish(job, queue, payload['video'])
+    print(f"  🚀 [Job {job['id']}] Uploaded → {payload['video_id']}", flush=True)
+    record_posted(payload['content'])
+    get_artifacts().release(job['id'])
+    return payload
+
+
+STAGE_HANDLERS = {
+    'content': stage_content,
+    'assets': stage_assets,
+    'render': stage_render,
+    'upload': stage_upload,
+}
+
+
+def stage_worker(queue, stage, stop, drain, failures):
+    """Claim and run jobs of one stage until stopped (or, when draining, idle)"""
+    upstream = STAGES[:STAGES.index(stage) + 1]
+    while not stop.is_set():
+        job = queue.claim(stage)
+        if job is None:
+            if drain and queue.active(upstream) == 0:
+                return
+            stop.wait(1 if drain else Config.WORKER_POLL_SECONDS)
+            continue
+
+        print(f"⚙️ [Job {job['id']}] {stage} (attempt {job['attempts']})", flush=True)
+        try:
+            with tracing.span(f'job.{stage}', job=job['id'], attempt=job['attempts']):
+                payload = STAGE_HANDLERS[stage](job, queue)
+        except Exception as e:
+            status = queue.fail(job['id'], e)
+            print(f"❌ [Job {job['id']}] {stage} failed ({status}): {e}", flush=True)
+            if status == 'failed':
+                from artifact_manager import get_artifacts
+                get_artifacts().release(job['id'])
+                failures.append(job['id'])
+            continue
+        next_stage = queue.complete(job['id'], payload)
+        print(f"✅ [Job {job['id']}] {stage} complete → {next_stage}", flush=True)
+
+
+def run_workers(queue, drain):
+    """Start STAGE_CONCURRENCY workers per stage; return ids of jobs that gave up"""
+    stop = threading.Event()
+    failures = []
+    workers = [
+        threading.Thread(target=stage_worker, args=(queue, stage, stop, drain, failures), name=f"{stage}-{i}", daemon=True)
+        for stage in STAGES
+        for i in range(Config.STAGE_CONCURRENCY.get(stage, 1))
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(timeout=1)
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+    return failures
+
+
+def run_cycle(queue=None):
+    """Produce and upload one video now (outside the posting schedule)"""
+    queue = queue or JobQueue()
+    job_id = queue.enqueue(time.time())
+    run_workers(queue, drain=True)
+    return queue.get(job_id)
+
+
+def tick(queue):
+    """Recover crashed jobs and top up the schedule"""
+    recovered = queue.recover()
+    if recovered:
+        print(f"♻️ Recovered {recovered} interrupted job(s)", flush=True)
+    for job_id in schedule(queue):
+        slot = queue.get(job_id)['publish_at']
+        print(f"🗓️ Scheduled job {job_id} for {datetime.fromtimestamp(slot, timezone.utc):%Y-%m-%d %H:%M} UTC", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spiritual Empire automation engine")
+    parser.add_argument('--once', action='store_true',
+                        help='Schedule, run all work that is due, then exit (for cron)')
+    parser.add_argument('--now', action='store_true', help='Produce and upload one video immediately')
+    args = parser.parse_args(argv)
+
+    print("🔮 Spiritual Empire Engine Starting...")
+    print(f"⏰ Posting every {Config.POST_INTERVAL_HOURS} hours")
+    check_environment()
+    queue = JobQueue()
+
+    if args.now:
+        job = run_cycle(queue)
+        return 0 if job['stage'] == 'done' else 1
 
-        print("🎤 Generating voice-over and video...")
-        create_video(script_text, audio_output)
-        print("✅ Video generation complete")
+    if args.once:
+        tick(queue)
+        failures = run_workers(queue, drain=True)
+        report = clients.latency_summary()
+        if report:
+            print(report, flush=True)
+        return 1 if failures else 0
 
-        print("🚀 Uploading to YouTube...")
-        # You can expand upload logic here
-        print("✅ Upload complete (placeholder)")
+    server = tracing.serve_metrics()
+    print(f"📈 Metrics on :{server.server_address[1]}/metrics", flush=True)
+    while True:
+        tick(queue)
+        counts = queue.counts()
+        for (stage, status), count in counts.items():
+            tracing.set_gauge('empire_queue_jobs', count, stage=stage, status=status)
+        print(f"📋 Queue: {counts}", flush=True)
+        run_workers(queue, drain=True)
+        time.sleep(Config.WORKER_POLL_SECONDS)
 
-    # main loop
-    print("🚀 Spiritual Empire Engine Starting...")
-    print("⏰ Posting every 8 hours")
-    run_cycle()
 
-except Exception as e:
-    print(f"❌ Error: {e}")
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Fake YouTube - Local stand-in for the YouTube resumable upload API
+Point YOUTUBE_API_ENDPOINT at it to exercise YouTubePublisher offline
+"""
+
+import argparse
+import json
+import re
+import threading
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_RANGE = re.compile(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_POST(self):
+        server = self.server
+        self._read_body()
+        if '/upload/' not in self.path or 'uploadType=resumable' not in self.path:
+            self._reply(404, {'error': {'code': 404, 'message': 'not found'}})
+            return
+        session_id = uuid.uuid4().hex
+        with server.lock:
+            server.sessions[session_id] = bytearray()
+        self._reply(200, headers={'Location': f"{server.url}/upload/session/{session_id}"})
+
+    def do_PUT(self):
+        server = self.server
+        body = self._read_body()
+        match = re.match(r'/upload/session/([0-9a-f]+)', self.path)
+        content_range = _RANGE.match(self.headers.get('Content-Range', ''))
+        total = content_range.group(4) if content_range else '*'
+        is_chunk = bool(content_range) and content_range.group(1) != '*'
+        with server.lock:
+            received = server.sessions.get(match.group(1)) if match else None
+            failure = server.failures.popleft() if server.failures and is_chunk else None
+        if received is None:
+            self._reply(404, {'error': {'code': 404, 'message': 'upload session not found'}})
+            return
+        if is_chunk and not 0 < int(content_range.group(3)) - int(content_range.group(2)) + 1 == len(body):
+            self._reply(400, {'error': {'code': 400, 'message': 'Invalid Content-Range'}})
+            return
+        if failure:
+            self._reply(failure, {'error': {'code': failure, 'errors': [{'reason': 'backendError'}]}})
+            return
+
+        with server.lock:
+            if is_chunk:
+                start = int(content_range.group(2))
+                if start == len(received):
+                    received.extend(body)
+                server.bytes_received += len(body)
+            size = len(received)
+
+        if total != '*' and size >= int(total):
+            video_id = f"fake-{match.group(1)[:11]}"
+            with server.lock:
+                server.uploads[video_id] = bytes(received)
+            self._reply(200, {'kind': 'youtube#video', 'id': video_id})
+        else:
+            headers = {'Range': f"bytes=0-{size - 1}"} if size else {}
+            self._reply(308, headers=headers)
+
+
+class FakeYouTubeServer(ThreadingHTTPServer):
+    """Implements just enough of videos.insert (uploadType=resumable) to test uploads
+
+    `failures` is a list of HTTP statuses returned, in order, for the next
+    chunk PUTs instead of accepting them (e.g. [503, 503]).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, failures=None):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.uploads = {}
+        self.failures = deque(failures or [])
+        self.bytes_received = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--fail', type=int, nargs='*', default=[], help='Statuses for the first chunk PUTs')
+    args = parser.parse_args()
+
+    server = FakeYouTubeServer(port=args.port, failures=args.fail)
+    print(f"🧪 Fake YouTube API on {server.url} (set YOUTUBE_API_ENDPOINT={server.url})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Durable SQLite-backed pipeline queue
+Each job moves through content → assets → render → upload, one stage at a time,
+with leases for crash recovery and backoff between retries
+"""
+
+import json
+import math
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+
+STAGES = ('content', 'assets', 'render', 'upload')
+DONE = 'done'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL DEFAULT '{}',
+    publish_at REAL NOT NULL UNIQUE,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (stage, status, next_attempt_at, publish_at);
+"""
+
+# A job is claimable when it is pending, past its backoff, and (for uploads) its slot has come
+_CLAIMABLE = """
+    status = 'pending' AND next_attempt_at <= :now
+    AND (stage != 'upload' OR publish_at <= :now)
+"""
+
+
+class JobQueue:
+    def __init__(self, path=None):
+        self.path = Path(path or Config.JOB_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    @contextmanager
+    def _db(self):
+        db = self._connect()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _row(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def enqueue(self, publish_at, payload=None):
+        """Add a job for a posting slot; a slot that already has a job is left alone"""
+        now = time.time()
+        with self._db() as db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (stage, status, payload, publish_at, created_at, updated_at) "
+                "VALUES (?, 'pending', ?, ?, ?, ?)",
+                (STAGES[0], json.dumps(payload or {}), publish_at, now, now)
+            )
+            return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, stage, lease_seconds=None):
+        """Atomically lease the next claimable job of a stage, or return None"""
+        now = time.time()
+        lease = lease_seconds or Config.JOB_LEASE_SECONDS
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                f"SELECT * FROM jobs WHERE stage = :stage AND {_CLAIMABLE} ORDER BY publish_at LIMIT 1",
+                {'stage': stage, 'now': now}
+            ).fetchone()
+            if row is None:
+                db.execute('COMMIT')
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE id = ?",
+                (now + lease, now, row['id'])
+            )
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        finally:
+            db.close()
+        job = self._row(row)
+        job['attempts'] += 1
+        return job
+
+    def complete(self, job_id, payload):
+        """Store a stage's results and move the job on to the next stage"""
+        now = time.time()
+        with self._db() as db:
+            stage = db.execute("SELECT stage FROM jobs WHERE id = ?", (job_id,)).fetchone()['stage']
+            index = STAGES.index(stage)
+            next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else DONE
+            db.execute(
+                "UPDATE jobs SET stage = ?, status = ?, attempts = 0, payload = ?, lease_until = NULL, "
+                "error = NULL, next_attempt_at = 0, updated_at = ? WHERE id = ?",
+                (next_stage, DONE if next_stage == DONE else 'pending', json.dumps(payload), now, job_id)
+            )
+        return next_stage
+
+    def update_payload(self, job_id, **fields):
+        """Merge fields into a job's stored payload without moving it on
+
+        For results that must survive a failed attempt, like the id of a
+        video that is already public.
+        """
+        with self._db() as db:
+            db.execute(
+                "UPDATE jobs SET payload = json_patch(payload, ?), updated_at = ? WHERE id = ?",
+                (json.dumps(fields), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; retry with backoff until JOB_MAX_ATTEMPTS"""
+        now = time.time()
+        with self._db() as db:
+            attempts = db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()['attempts']
+            if attempts >= Config.JOB_MAX_ATTEMPTS:
+                status, next_attempt = 'failed', 0
+            else:
+                status, next_attempt = 'pending', now + min(3600, 30 * 2 ** (attempts - 1))
+            db.execute(
+                "UPDATE jobs SET status = ?, next_attempt_at = ?, lease_until = NULL, error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, next_attempt, str(error)[:2000], now, job_id)
+            )
+        return status
+
+    def recover(self):
+        """Return jobs whose worker died (lease expired) to their current stage"""
+        now = time.time()
+        with self._db() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'pending', lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_until < ?",
+                (now, now)
+            )
+            return cursor.rowcount
+
+    def active(self, stages):
+        """Count jobs in `stages` that are running or claimable right now"""
+        placeholders = ','.join('?' for _ in stages)
+        now = time.time()
+        with self._db() as db:
+            return db.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE stage IN ({placeholders}) AND "
+                f"(status = 'running' OR (status = 'pending' AND next_attempt_at <= ? "
+                f"AND (stage != 'upload' OR publish_at <= ?)))",
+                (*stages, now, now)
+            ).fetchone()[0]
+
+    def counts(self):
+        """{(stage, status): count} for every job in the queue"""
+        with self._db() as db:
+            rows = db.execute("SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status").fetchall()
+        return {(stage, status): count for stage, status, count in rows}
+
+    def recent_scripts(self, limit=None):
+        """Scripts of the most recent jobs that got past the content stage"""
+        limit = limit or Config.CONTENT_RECENT_SCRIPTS
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT payload FROM jobs WHERE stage != 'content' ORDER BY publish_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        payloads = (json.loads(row['payload']) for row in rows)
+        return [p['content']['script'] for p in payloads if p.get('content', {}).get('script')]
+
+    def queued_themes(self):
+        """Themes of jobs that have their content but are not uploaded yet"""
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT payload FROM jobs WHERE stage NOT IN ('content', ?) AND status != 'failed'", (DONE,)
+            ).fetchall()
+        payloads = (json.loads(row['payload']) for row in rows)
+        return [p['content']['theme'] for p in payloads if p.get('content', {}).get('theme')]
+
+    def finished_since(self, since):
+        """Uploaded jobs whose last update is after `since`, oldest first"""
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT * FROM jobs WHERE stage = ? AND updated_at > ? ORDER BY updated_at", (DONE, since)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def get(self, job_id):
+        with self._db() as db:
+            return self._row(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+
+def posting_slots(now=None, ahead=None, interval_hours=None):
+    """Upcoming posting times on the POST_INTERVAL_HOURS grid (UTC-aligned)"""
+    now = time.time() if now is None else now
+    interval = (interval_hours or Config.POST_INTERVAL_HOURS) * 3600
+    ahead = Config.SCHEDULE_AHEAD_SLOTS if ahead is None else ahead
+    first = math.ceil(now / interval) * interval
+    return [first + i * interval for i in range(ahead)]
+
+
+def schedule(queue, now=None):
+    """Make sure every upcoming slot has a job, so renders finish before their slot"""
+    created = [queue.enqueue(slot) for slot in posting_slots(now)]
+    return [job_id for job_id in created if job_id]
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Media Probe - One probe per media file
+Reads duration, sample rate, channels and codec once and memoizes by path+mtime
+"""
+
+import json
+import os
+import threading
+import wave
+from collections import namedtuple
+import process_runner
+
+MediaInfo = namedtuple('MediaInfo', ['duration', 'sample_rate', 'channels', 'codec'])
+
+_lock = threading.Lock()
+_memo = {}
+_stats = {'hits': 0, 'parsed': 0, 'ffprobe': 0}
+
+# MPEG audio Layer III tables, indexed by the version bits of the frame header
+_MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2
+    0: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],      # MPEG-2.5
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+def mp3_info(data):
+    """Parse MP3 frame headers in-process; returns MediaInfo or None if not Layer III"""
+    view = memoryview(data)
+    pos = 0
+    if bytes(view[:3]) == b'ID3' and len(view) >= 10:
+        size = (view[6] << 21) | (view[7] << 14) | (view[8] << 7) | view[9]
+        pos = 10 + size + (10 if view[5] & 0x10 else 0)
+
+    samples = 0
+    sample_rate = channels = None
+    first = True
+    end = len(view) - 4
+    while pos <= end:
+        if view[pos] != 0xFF or (view[pos + 1] & 0xE0) != 0xE0:
+            if sample_rate is None:
+                pos += 1  # tolerate junk before the first frame
+                continue
+            break
+        version = (view[pos + 1] >> 3) & 0x03
+        layer = (view[pos + 1] >> 1) & 0x03
+        bitrate_index = view[pos + 2] >> 4
+        rate_index = (view[pos + 2] >> 2) & 0x03
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            if sample_rate is None:
+                pos += 1
+                continue
+            break
+        rate = _MP3_SAMPLE_RATES[version][rate_index]
+        bitrate = _MP3_BITRATES[version][bitrate_index] * 1000
+        padding = (view[pos + 2] >> 1) & 0x01
+        frame_samples = 1152 if version == 3 else 576
+        frame_length = frame_samples // 8 * bitrate // rate + padding
+        if sample_rate is None:
+            sample_rate = rate
+            channels = 1 if (view[pos + 3] >> 6) == 3 else 2
+        # A leading Xing/Info frame is metadata, not audio
+        header = bytes(view[pos:pos + min(frame_length, 64)])
+        if not (first and (b'Xing' in header or b'Info' in header)):
+            samples += frame_samples
+        first = False
+        pos += frame_length
+
+    if sample_rate is None:
+        return None
+    return MediaInfo(samples / sample_rate, sample_rate, channels, 'mp3')
+
+
+def wav_info(path):
+    """Read a WAV header in-process"""
+    with wave.open(str(path), 'rb') as w:
+        return MediaInfo(
+            w.getnframes() / w.getframerate(),
+            w.getframerate(),
+            w.getnchannels(),
+            f"pcm_s{w.getsampwidth() * 8}le",
+        )
+
+
+def _ffprobe(path):
+    """Single ffprobe call returning format duration and the first audio stream"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration:stream=codec_type,codec_name,sample_rate,channels',
+        '-of', 'json',
+        str(path)
+    ]
+    result = process_runner.run(cmd, capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), streams[0] if streams else {})
+    return MediaInfo(
+        float(data.get('format', {}).get('duration', 0.0)),
+        int(audio['sample_rate']) if audio.get('sample_rate') else None,
+        audio.get('channels'),
+        audio.get('codec_name'),
+    )
+
+
+def _memo_key(path):
+    stat = os.stat(path)
+    return os.path.realpath(path), stat.st_mtime_ns, stat.st_size
+
+
+def probe(path):
+    """Return MediaInfo for a file, probing it at most once per version"""
+    key = _memo_key(path)
+    with _lock:
+        if key in _memo:
+            _stats['hits'] += 1
+            return _memo[key]
+
+    info = None
+    suffix = os.path.splitext(str(path))[1].lower()
+    try:
+        if suffix == '.wav':
+            info = wav_info(path)
+        elif suffix == '.mp3':
+            with open(path, 'rb') as f:
+                info = mp3_info(f.read())
+    except (wave.Error, EOFError):
+        info = None
+
+    with _lock:
+        if info is not None:
+            _stats['parsed'] += 1
+        else:
+            _stats['ffprobe'] += 1
+    if info is None:
+        info = _ffprobe(path)
+
+    with _lock:
+        _memo[key] = info
+    return info
+
+
+def remember(path, info):
+    """Seed the memo with metadata already known (e.g. from decoded audio)"""
+    key = _memo_key(path)
+    with _lock:
+        _memo[key] = info
+
+
+def duration(path):
+    """Duration in seconds"""
+    return probe(path).duration
+
+
+def stats():
+    """Memo hits, in-process header parses and ffprobe spawns so far"""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Music Bed - Loudness-normalized background music, prepared once per track
+Each track is decoded and measured (EBU R128) in a single ffmpeg pass, gained to
+MUSIC_BED_LUFS and cached as PCM; per-duration beds with a fade-out are cut from
+that in NumPy, so a render only has to add the bed to the voice
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+import wave
+from pathlib import Path
+import numpy as np
+from config import Config
+from asset_cache import get_cache, file_digest
+import process_runner
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+AUDIO_SUFFIXES = ('.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac')
+LEGACY_TRACK = Path('assets/background_music.mp3')
+PEAK_CEILING = 0.98  # linear; loud tracks are never gained into clipping
+
+_INTEGRATED = re.compile(r'Integrated loudness:\s+I:\s+(-?[\d.]+|-inf) LUFS')
+
+_lock = threading.Lock()
+_digests = {}
+
+
+def library(music_dir=None):
+    """Every track in MUSIC_DIR (recursively) plus the legacy single-track location"""
+    root = Path(music_dir or Config.MUSIC_DIR)
+    tracks = sorted(p for p in root.rglob('*') if p.suffix.lower() in AUDIO_SUFFIXES) if root.is_dir() else []
+    if LEGACY_TRACK.exists() and LEGACY_TRACK not in tracks:
+        tracks.append(LEGACY_TRACK)
+    return tracks
+
+
+def pick_track(theme=None, seed='', music_dir=None):
+    """Choose a track for a theme, stable for the same (theme, seed)
+
+    Tracks in a sub-folder whose name appears in the theme (for example
+    assets/music/meditation/) are preferred over the rest of the library.
+    """
+    tracks = library(music_dir)
+    if not tracks:
+        return None
+    theme = (theme or '').lower()
+    themed = [t for t in tracks if t.parent.name.lower() in theme and t.parent != LEGACY_TRACK.parent]
+    candidates = themed or tracks
+    digest = hashlib.sha1(f"{theme}\0{seed}".encode('utf-8')).digest()
+    return candidates[int.from_bytes(digest[:4], 'big') % len(candidates)]
+
+
+def _track_digest(path):
+    """Content hash of a track, memoized per file version"""
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if key in _digests:
+            return _digests[key]
+    digest = file_digest(path)
+    with _lock:
+        _digests[key] = digest
+    return digest
+
+
+def decode_and_measure(path):
+    """Decode a track to float32 PCM (48 kHz stereo) and measure its integrated loudness
+
+    One ffmpeg spawn: the ebur128 filter passes the audio through and prints
+    its summary on stderr.
+    """
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostats', '-nostdin', '-i', str(path),
+        '-af', 'ebur128=framelog=quiet',
+        '-f', 'f32le', '-ar', str(SAMPLE_RATE), '-ac', str(CHANNELS), 'pipe:1'
+    ]
+    result = process_runner.run(cmd, capture_output=True, check=True)
+    samples = np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, CHANNELS)
+    matches = _INTEGRATED.findall(result.stderr.decode(errors='replace'))
+    loudness = float(matches[-1]) if matches else float('-inf')
+    return samples, loudness
+
+
+def _write_wav(path, samples):
+    pcm = np.clip(samples * 32767.0, -32768, 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(CHANNELS)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+
+
+def _read_wav(path):
+    with wave.open(str(path), 'rb') as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+    return pcm.reshape(-1, CHANNELS).astype(np.float32) / 32767.0
+
+
+def normalized_track(track, target_lufs=None):
+    """Cached path of the whole track gained to `target_lufs` (16-bit PCM WAV)"""
+    target = Config.MUSIC_BED_LUFS if target_lufs is None else target_lufs
+    cache = get_cache()
+
+    def produce(path):
+        samples, loudness = decode_and_measure(track)
+        gain = 10 ** ((target - loudness) / 20) if math.isfinite(loudness) else 0.0
+        peak = float(np.abs(samples).max()) if samples.size else 0.0
+        if peak * gain > PEAK_CEILING:
+            gain = PEAK_CEILING / peak
+        _write_wav(path, samples * gain)
+        print(f"  🎼 Normalized {Path(track).name}: {loudness:.1f} LUFS → {target:.1f} LUFS", flush=True)
+
+    return cache.entry(("music-norm", _track_digest(track), target, SAMPLE_RATE, CHANNELS), '.wav', produce)
+
+
+def bed(track, seconds, target_lufs=None, fade=None):
+    """Cached bed of `seconds` (rounded up) cut from the normalized track
+
+    Short tracks loop; the last `fade` seconds fade out so the bed ends with
+    the voice-over instead of being cut mid-phrase.
+    """
+    target = Config.MUSIC_BED_LUFS if target_lufs is None else target_lufs
+    fade = Config.MUSIC_FADE_SECONDS if fade is None else fade
+    seconds = max(1, math.ceil(seconds))
+    cache = get_cache()
+
+    def produce(path):
+        samples = _read_wav(normalized_track(track, target))
+        frames = seconds * SAMPLE_RATE
+        if len(samples) < frames:
+            samples = np.tile(samples, (math.ceil(frames / max(len(samples), 1)), 1))
+        segment = samples[:frames].copy()
+        fade_frames = min(int(fade * SAMPLE_RATE), frames)
+        if fade_frames:
+            segment[-fade_frames:] *= np.linspace(1.0, 0.0, fade_frames, dtype=np.float32)[:, None]
+        _write_wav(path, segment)
+
+    return cache.entry(("music-bed", _track_digest(track), target, fade, seconds), '.wav', produce)
+
+
+def bed_for(theme, duration, seed='', dest=None):
+    """Pick a track for the theme and return a bed for `duration` (None without music)
+
+    With `dest` the bed is materialised there (hard-linked from the cache).
+    """
+    track = pick_track(theme, seed)
+    if track is None:
+        return None
+    path = bed(track, duration)
+    if dest is None:
+        return path
+    get_cache().materialise(path, dest)
+    return Path(dest)
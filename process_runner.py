@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Process Runner - Counted subprocess launches
+Every ffmpeg/ffprobe spawn goes through here so spawns per video can be measured
+"""
+
+import subprocess
+import threading
+from collections import Counter
+from pathlib import Path
+
+_lock = threading.Lock()
+_spawns = Counter()
+
+
+def _count(cmd):
+    with _lock:
+        _spawns[Path(str(cmd[0])).name] += 1
+
+
+def run(cmd, **kwargs):
+    """subprocess.run, counted"""
+    _count(cmd)
+    return subprocess.run(cmd, **kwargs)
+
+
+def popen(cmd, **kwargs):
+    """subprocess.Popen, counted"""
+    _count(cmd)
+    return subprocess.Popen(cmd, **kwargs)
+
+
+def spawn_counts():
+    """Spawns so far in this process, by executable name"""
+    with _lock:
+        return dict(_spawns)
+
+
+def spawn_total():
+    """Total spawns so far in this process"""
+    with _lock:
+        return sum(_spawns.values())
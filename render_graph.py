@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Render Graph - Declarative renders compiled to a single ffmpeg invocation
+A graph names its sources (piped raw frames, a subtitle overlay, audio tracks
+to sum) and its outputs (encode specs). Compiling drops stages that would do
+nothing and is memoized by the graph's structure; the graph's hash is the
+asset-cache key of what it renders
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+FRAGMENTED_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+
+
+def frames(size, fps, pix_fmt='yuv420p', key=None):
+    """Raw video piped to ffmpeg's stdin; `key` identifies what the frames show"""
+    return {'size': list(size), 'fps': fps, 'pix_fmt': pix_fmt, 'key': key}
+
+
+def graph(video, outputs, subtitles=None, audio=(), duration=None, shortest=False):
+    """A render of `video` (see frames) encoded once per entry of `outputs` ({name: spec})
+
+    Sources are given by identity - a content digest or any JSON-able key -
+    and only bound to paths by command(). `subtitles` is burnt in, `audio`
+    tracks are summed as they are (each already at its final level), and the
+    outputs are cut at `duration` seconds or, with `shortest`, at the end of
+    the shorter of video and audio.
+
+    Output specs take 'kind' ('video' or 'poster', a JPEG of the frame `at`
+    seconds in), 'size', the libx264 settings of encode_args, 'audio_bitrate'
+    and 'fragmented' (fragmented MP4 instead of +faststart).
+    """
+    return {
+        'video': video,
+        'subtitles': subtitles,
+        'audio': list(audio),
+        'duration': duration,
+        'shortest': shortest,
+        'outputs': {name: dict(spec) for name, spec in outputs.items()},
+    }
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, default=list, separators=(',', ':'))
+
+
+def structure(render):
+    """The graph without its source identities: everything the ffmpeg command depends on"""
+    return {
+        **render,
+        'video': {**render['video'], 'key': None},
+        'subtitles': render['subtitles'] is not None,
+        'audio': len(render['audio']),
+    }
+
+
+def graph_key(render, output=None):
+    """Hash of a render, or of one output of it (independent of the other outputs and their names)"""
+    if output is not None:
+        render = {**render, 'outputs': [render['outputs'][output]]}
+    return hashlib.sha256(_canonical(render).encode('utf-8')).hexdigest()
+
+
+def encode_args(spec, fps):
+    """libx264 arguments for the settings an output spec has (single pass)"""
+    args = ['-c:v', 'libx264']
+    if spec.get('preset'):
+        args += ['-preset', spec['preset']]
+    if spec.get('crf') is not None:
+        args += ['-crf', str(spec['crf'])]
+    if spec.get('gop_seconds'):
+        gop = int(fps * spec['gop_seconds'])
+        args += ['-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0']
+    if spec.get('threads'):
+        args += ['-threads', str(spec['threads'])]
+    args += ['-pix_fmt', 'yuv420p']
+    if spec.get('tune'):
+        args += ['-tune', spec['tune']]
+    if spec.get('maxrate'):
+        args += ['-maxrate', spec['maxrate'], '-bufsize', spec.get('bufsize', spec['maxrate'])]
+    return args
+
+
+def compile_graph(render):
+    """ffmpeg argument template of a graph, with {subtitles}, {audio[i]} and {outputs[name]} slots"""
+    return _compile(_canonical(structure(render)))
+
+
+@lru_cache(maxsize=128)
+def _compile(shape):
+    render = json.loads(shape)
+    video = render['video']
+    fps = video['fps']
+    duration = render['duration']
+    outputs = [(name, {'kind': 'video', 'size': video['size'], **render['outputs'][name]})
+               for name in sorted(render['outputs'])]
+    # Audio no output encodes is not even opened
+    audio_outputs = sum(spec['kind'] == 'video' for _, spec in outputs)
+    audio_count = render['audio'] if audio_outputs else 0
+
+    args = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', video['pix_fmt'],
+        '-s', f"{video['size'][0]}x{video['size'][1]}", '-r', str(fps),
+        '-i', 'pipe:0',
+    ]
+    for i in range(audio_count):
+        args += ['-i', f'{{audio[{i}]}}']
+
+    # Video: overlay once, split once per output, then trim / scale only where needed
+    shared = ['ass={subtitles}'] if render['subtitles'] else []
+    tails = []
+    for _, spec in outputs:
+        tail = []
+        if spec['kind'] == 'poster':
+            frame = int(spec.get('at', 0) * fps)
+            if duration:
+                frame = min(frame, max(int(duration * fps) - 1, 0))
+            tail.append(f"trim=start_frame={frame}:end_frame={frame + 1}")
+        if list(spec['size']) != list(video['size']):
+            tail.append(f"scale={spec['size'][0]}:{spec['size'][1]}:flags=lanczos")
+        tails.append(tail)
+    filters = []
+    if len(outputs) == 1:
+        chain = shared + tails[0]
+        video_maps = ['[v0]'] if chain else ['0:v']
+        if chain:
+            filters.append(f"[0:v]{','.join(chain)}[v0]")
+    else:
+        branches = [f"[s{i}]" for i in range(len(outputs))]
+        filters.append(f"[0:v]{','.join(shared + [f'split={len(outputs)}'])}{''.join(branches)}")
+        video_maps = []
+        for i, (branch, tail) in enumerate(zip(branches, tails)):
+            if tail:
+                filters.append(f"{branch}{','.join(tail)}[o{i}]")
+                branch = f"[o{i}]"
+            video_maps.append(branch)
+
+    # Audio: one track maps straight through; several are summed (normalize=0, no renormalization)
+    audio_maps = []
+    if audio_count == 1 and audio_outputs == 1:
+        audio_maps = ['1:a']
+    elif audio_count:
+        chain = ''.join(f"[{i + 1}:a]" for i in range(audio_count))
+        if audio_count > 1:
+            chain += f"amix=inputs={audio_count}:duration=first:normalize=0"
+        if audio_outputs > 1:
+            audio_maps = [f"[a{i}]" for i in range(audio_outputs)]
+            chain += f"{',' if audio_count > 1 else ''}asplit={audio_outputs}{''.join(audio_maps)}"
+        else:
+            audio_maps = ['[a0]']
+            chain += '[a0]'
+        filters.append(chain)
+
+    if filters:
+        args += ['-filter_complex', ';'.join(filters)]
+    audio_maps = iter(audio_maps)
+    for (name, spec), video_map in zip(outputs, video_maps):
+        destination = f'{{outputs[{name}]}}'
+        if spec['kind'] == 'poster':
+            args += ['-map', video_map, '-frames:v', '1', '-q:v', '2', '-update', '1', destination]
+            continue
+        args += ['-map', video_map]
+        if audio_count:
+            args += ['-map', next(audio_maps)]
+            if render['shortest']:
+                args.append('-shortest')
+        if duration:
+            args += ['-t', str(duration)]
+        args += encode_args(spec, fps)
+        if audio_count:
+            args += ['-c:a', 'aac']
+            if spec.get('audio_bitrate'):
+                args += ['-b:a', spec['audio_bitrate']]
+        args += ['-movflags', FRAGMENTED_MOVFLAGS if spec.get('fragmented') else '+faststart', destination]
+    return tuple(args)
+
+
+def command(render, outputs, subtitles=None, audio=()):
+    """ffmpeg arguments for a graph with its sources and `outputs` ({name: path}) bound to paths"""
+    values = {
+        'subtitles': str(subtitles),
+        'audio': [str(path) for path in audio],
+        'outputs': {name: str(path) for name, path in outputs.items()},
+    }
+    return [arg.format_map(values) for arg in compile_graph(render)]
+
+
+def cache_info():
+    """lru_cache statistics for compiled graphs"""
+    return _compile.cache_info()
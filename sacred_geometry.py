@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Sacred Geometry - Procedural animated backgrounds with NumPy
+Pattern geometry is computed once per size as a palette-index grid; each frame
+only rebuilds a 256-entry colour table (and, for rotating patterns, a few
+vectorized passes over precomputed grids) before it is piped to ffmpeg as yuv420p
+"""
+
+import math
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+from background_renderer import audio_input, pipe_frames
+import render_graph
+
+PATTERNS = ('flower_of_life', 'mandala', 'radial')
+
+# Cosine palettes: colour(p) = a + b * cos(2π (c * p + d)), per RGB channel
+PALETTES = {
+    'gold': ((0.55, 0.40, 0.25), (0.45, 0.35, 0.25), (1.0, 1.0, 1.0), (0.00, 0.08, 0.20)),
+    'indigo': ((0.30, 0.25, 0.55), (0.25, 0.20, 0.40), (1.0, 1.0, 1.0), (0.55, 0.60, 0.70)),
+    'teal': ((0.20, 0.45, 0.50), (0.20, 0.35, 0.35), (1.0, 1.0, 1.0), (0.50, 0.30, 0.25)),
+    'chakra': ((0.45, 0.40, 0.50), (0.35, 0.35, 0.35), (1.0, 1.0, 1.0), (0.00, 0.33, 0.67)),
+}
+
+# Pattern and palette per content theme (matched by keyword)
+THEME_STYLES = {
+    'geometry': ('flower_of_life', 'gold'),
+    'meditation': ('radial', 'indigo'),
+    'manifestation': ('mandala', 'gold'),
+    'chakra': ('mandala', 'chakra'),
+    'wisdom': ('flower_of_life', 'teal'),
+}
+
+PHASE_LEVELS = 64          # palette steps; the low 2 bits of an index are glow
+PALETTE_SPEED = 0.04       # palette cycles per second (rings drift outward)
+BREATH_SECONDS = 8.0       # brightness swell, one slow breath
+ROTATION_SPEED = 0.02      # mandala turns per second
+PETALS = 12
+GLOW_COLOUR = np.array([1.0, 0.86, 0.58])
+
+
+def style_for(theme):
+    """(pattern, palette) for a content theme"""
+    theme = (theme or '').lower()
+    for keyword, style in THEME_STYLES.items():
+        if keyword in theme:
+            return style
+    return 'flower_of_life', 'gold'
+
+
+def _grid(width, height):
+    """Centred coordinates scaled so the shorter side spans [-1, 1]"""
+    scale = 2.0 / min(width, height)
+    x = (np.arange(width, dtype=np.float32) - (width - 1) / 2) * scale
+    y = (np.arange(height, dtype=np.float32) - (height - 1) / 2) * scale
+    return np.meshgrid(x, y)
+
+
+def _glow_levels(distance, width):
+    """Quantize a distance-to-line field into 0-3 glow levels"""
+    glow = np.exp(-(distance / width) ** 2) * 3.999
+    return glow.astype(np.uint8)
+
+
+def _flower_of_life(x, y, r):
+    radius = 0.28
+    centres = [(0.0, 0.0)]
+    for ring in (1, 2):
+        for k in range(6 * ring):
+            # Hex lattice: walk each of the six edges of ring `ring`
+            side, step = divmod(k, ring)
+            a0 = math.pi / 3 * side
+            a1 = math.pi / 3 * (side + 1)
+            cx = ring * radius * math.cos(a0) + step * radius * (math.cos(a1) - math.cos(a0))
+            cy = ring * radius * math.sin(a0) + step * radius * (math.sin(a1) - math.sin(a0))
+            centres.append((cx, cy))
+    distance = np.full(x.shape, np.inf, dtype=np.float32)
+    for cx, cy in centres:
+        np.minimum(distance, np.abs(np.hypot(x - cx, y - cy) - radius), out=distance)
+    np.minimum(distance, np.abs(r - 3 * radius), out=distance)  # enclosing circle
+    phase = r * 1.5
+    return phase, None, _glow_levels(distance, 0.012)
+
+
+def _mandala(x, y, r, theta, petals=PETALS):
+    amplitude = 0.35 * np.exp(-r)
+    rotating = (amplitude * np.cos(petals * theta), amplitude * np.sin(petals * theta))
+    rings = np.abs(((r * 6) % 1.0) - 0.5) / 6  # distance to the nearest of the rings r = k/6
+    return r * 2.0, rotating, _glow_levels(rings, 0.006)
+
+
+def _radial(x, y, r):
+    return r * 2.5, None, _glow_levels(r, 0.18)
+
+
+@lru_cache(maxsize=8)
+def fields(pattern, width, height):
+    """Precomputed grids for one pattern and size
+
+    Returns (phase, rotating, glow): phase in palette cycles, optional
+    (cos, sin) grids that rotate with time, and 0-3 glow levels, all
+    read-only. Static patterns come back with phase already merged with
+    glow into a uint8 index grid.
+    """
+    x, y = _grid(width, height)
+    r = np.hypot(x, y)
+    if pattern == 'flower_of_life':
+        phase, rotating, glow = _flower_of_life(x, y, r)
+    elif pattern == 'mandala':
+        phase, rotating, glow = _mandala(x, y, r, np.arctan2(y, x))
+    elif pattern == 'radial':
+        phase, rotating, glow = _radial(x, y, r)
+    else:
+        raise ValueError(f"Unknown pattern: {pattern}")
+
+    if rotating is None:
+        phase = _index(phase * 256, glow)
+    else:
+        phase = (phase * 256).astype(np.float32)
+        rotating = tuple((grid * 256).astype(np.float32) for grid in rotating)
+    for grid in (phase, glow) + (rotating or ()):
+        grid.flags.writeable = False
+    return phase, rotating, glow
+
+
+def _index(scaled_phase, glow, out=None, scratch=None):
+    """Pack phase (×256, in palette cycles) and glow into uint8 palette indices"""
+    if scratch is None:
+        scratch = np.empty(scaled_phase.shape, dtype=np.uint16)
+    # Casting to uint16 then uint8 keeps phase mod 1 cycle in the high 6 bits
+    np.copyto(scratch, scaled_phase, casting='unsafe')
+    if out is None:
+        out = np.empty(scaled_phase.shape, dtype=np.uint8)
+    np.copyto(out, scratch, casting='unsafe')
+    np.bitwise_and(out, 0xFC, out=out)
+    np.bitwise_or(out, glow, out=out)
+    return out
+
+
+def palette_rgb(t, palette='gold'):
+    """(256, 3) float RGB table for time `t`, indexed like the pattern grids"""
+    a, b, c, d = (np.array(v) for v in PALETTES[palette])
+    index = np.arange(256)
+    phase = (index >> 2) / PHASE_LEVELS - t * PALETTE_SPEED
+    rgb = a + b * np.cos(2 * np.pi * (c * phase[:, None] + d))
+    breath = 0.85 + 0.15 * math.sin(2 * math.pi * t / BREATH_SECONDS)
+    glow = ((index & 3) / 3 * (0.6 + 0.4 * breath))[:, None]
+    rgb = rgb * breath * (1 - glow) + GLOW_COLOUR * glow
+    return np.clip(rgb, 0.0, 1.0)
+
+
+def yuv_tables(rgb):
+    """Limited-range BT.601 Y, Cb and Cr lookup tables (as lists for Image.point)"""
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    y = 16 + 65.481 * r + 128.553 * g + 24.966 * b
+    cb = 128 - 37.797 * r - 74.203 * g + 112.0 * b
+    cr = 128 + 112.0 * r - 93.786 * g - 18.214 * b
+    return tuple(np.clip(np.rint(plane), 0, 255).astype(np.uint8).tolist() for plane in (y, cb, cr))
+
+
+def iter_frames(pattern, frame_count, fps, width, height, palette='gold'):
+    """Yield yuv420p frames (one reused bytearray) for an animated pattern"""
+    phase, rotating, glow = fields(pattern, width, height)
+    luma_size = width * height
+    chroma_w, chroma_h = width // 2, height // 2
+    chroma_size = chroma_w * chroma_h
+    frame = bytearray(luma_size + 2 * chroma_size)
+
+    if rotating is None:
+        index = phase
+    else:
+        index = np.empty((height, width), dtype=np.uint8)
+        scaled = np.empty((height, width), dtype=np.float32)
+        turn = np.empty((height, width), dtype=np.float32)
+        scratch = np.empty((height, width), dtype=np.uint16)
+        cos_grid, sin_grid = rotating
+
+    def index_images():
+        luma = Image.frombuffer('L', (width, height), index, 'raw', 'L', 0, 1)
+        return luma, luma.resize((chroma_w, chroma_h), Image.NEAREST)
+
+    if rotating is None:
+        luma, half = index_images()
+    for i in range(frame_count):
+        t = i / fps
+        if rotating is not None:
+            # cos(n(θ - ωt)) = cos nθ cos nωt + sin nθ sin nωt, from the precomputed grids
+            angle = 2 * math.pi * ROTATION_SPEED * t * PETALS
+            np.multiply(cos_grid, math.cos(angle), out=scaled)
+            np.multiply(sin_grid, math.sin(angle), out=turn)
+            scaled += turn
+            scaled += phase
+            _index(scaled, glow, out=index, scratch=scratch)
+            luma, half = index_images()
+        y_table, cb_table, cr_table = yuv_tables(palette_rgb(t, palette))
+        frame[:luma_size] = luma.point(y_table).tobytes()
+        frame[luma_size:luma_size + chroma_size] = half.point(cb_table).tobytes()
+        frame[luma_size + chroma_size:] = half.point(cr_table).tobytes()
+        yield frame
+
+
+def still_image(path, pattern='flower_of_life', width=1024, height=1792, palette='gold', t=0.0):
+    """Write one frame as an RGB image (the zero-cost stand-in for a DALL·E still)"""
+    phase, rotating, glow = fields(pattern, width, height)
+    index = phase if rotating is None else _index(phase + rotating[0], glow)
+    rgb = np.rint(palette_rgb(t, palette) * 255).astype(np.uint8)
+    Image.fromarray(rgb[index]).save(path)
+    return path
+
+
+def geometry_graph(pattern='flower_of_life', palette='gold', audio=None, width=1080, height=1920, fps=30,
+                   preset='ultrafast', crf=23, duration=None):
+    """Render graph of `duration` seconds of a pattern with an optional audio track (identified by `audio`)"""
+    return render_graph.graph(
+        video=render_graph.frames((width, height), fps, key=('sacred-geometry', pattern, palette, duration)),
+        audio=[audio] if audio else [],
+        shortest=True,
+        outputs={'video': {'preset': preset, 'crf': crf}},
+    )
+
+
+def render_geometry(output_filename, duration, pattern='flower_of_life', palette='gold',
+                    audio_path=None, audio_data=None, width=1080, height=1920, fps=30,
+                    preset='ultrafast', crf=23):
+    """Stream an animated pattern (plus optional audio) straight into an encode"""
+    frame_count = int(duration * fps)
+    with audio_input(audio_path, audio_data) as audio:
+        graph = geometry_graph(pattern, palette, bool(audio), width, height, fps, preset, crf, duration)
+        cmd = render_graph.command(graph, {'video': output_filename}, audio=[audio] if audio else [])
+        return pipe_frames(cmd, iter_frames(pattern, frame_count, fps, width, height, palette))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Subtitle Timing - Word-weighted caption timing
+Pure functions that split a script into 3-5 word cues, time them by spoken
+weight (syllables plus punctuation pauses) or TTS word timestamps, and render
+SRT/ASS text in memory
+"""
+
+import re
+from functools import lru_cache
+
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+_SILENT_E = re.compile(r'[^aeiouy]e$')
+
+# Extra weight, in syllable-equivalents, for the pause after punctuation
+PAUSE_WEIGHTS = {',': 1.0, ';': 1.5, ':': 1.5, '—': 1.5, '-': 1.0, '.': 2.0, '!': 2.0, '?': 2.0, '…': 2.5}
+CHUNK_BREAKS = ('.', ',', '!', '?')
+
+ASS_STYLE = {
+    'Fontname': 'Arial', 'Fontsize': 24, 'PrimaryColour': '&H00FFFFFF', 'SecondaryColour': '&H000000FF',
+    'OutlineColour': '&H00000000', 'BackColour': '&H80000000', 'Bold': -1, 'Italic': 0,
+    'Underline': 0, 'StrikeOut': 0, 'ScaleX': 100, 'ScaleY': 100, 'Spacing': 0, 'Angle': 0,
+    'BorderStyle': 4, 'Outline': 2, 'Shadow': 0, 'Alignment': 2,
+    'MarginL': 10, 'MarginR': 10, 'MarginV': 80, 'Encoding': 1,
+}
+
+
+@lru_cache(maxsize=16384)
+def syllables(word):
+    """Rough English syllable count (vowel groups, minus a silent final e)"""
+    word = word.lower().strip(".,!?;:—-…\"'()")
+    if not word:
+        return 0
+    count = len(_VOWEL_GROUPS.findall(word))
+    if count > 1 and _SILENT_E.search(word):
+        count -= 1
+    return max(count, 1)
+
+
+def chunk_words(words):
+    """Group words into 3-5 word chunks, breaking early at punctuation"""
+    chunks = []
+    current = []
+    for word in words:
+        current.append(word)
+        if len(current) >= 3 and (len(current) >= 5 or word.endswith(CHUNK_BREAKS)):
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_weight(words):
+    """Spoken weight of a chunk: syllables plus the pause after its last word"""
+    weight = sum(syllables(w) for w in words)
+    return weight + PAUSE_WEIGHTS.get(words[-1][-1:], 0.0)
+
+
+def time_cues(script, duration, word_timestamps=None):
+    """Return [(start, end, text), ...] covering `duration` seconds
+
+    With `word_timestamps` (a list of (start, end) per word of the script, as
+    returned by a TTS/ASR engine) cues follow the real speech; otherwise each
+    chunk gets a share of the duration proportional to its spoken weight.
+    """
+    words = script.split()
+    if not words:
+        return []
+    chunks = chunk_words(words)
+
+    cues = []
+    if word_timestamps and len(word_timestamps) == len(words):
+        index = 0
+        for chunk in chunks:
+            start = word_timestamps[index][0]
+            index += len(chunk)
+            cues.append((start, word_timestamps[index - 1][1], ' '.join(chunk)))
+        return cues
+
+    weights = [chunk_weight(chunk) for chunk in chunks]
+    if not sum(weights):
+        weights = [1.0] * len(chunks)  # nothing pronounceable (e.g. "()"): split evenly
+    scale = duration / sum(weights)
+    start = 0.0
+    for chunk, weight in zip(chunks, weights):
+        end = start + weight * scale
+        cues.append((start, end, ' '.join(chunk)))
+        start = end
+    return cues
+
+
+def format_srt_time(seconds):
+    """HH:MM:SS,mmm"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def format_ass_time(seconds):
+    """H:MM:SS.cc"""
+    centis = int(round(seconds * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def to_srt(cues):
+    """Render cues as SRT text"""
+    return ''.join(
+        f"{i}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text}\n\n"
+        for i, (start, end, text) in enumerate(cues, 1)
+    )
+
+
+def to_ass(cues, width=384, height=288, style=None):
+    """Render cues as a self-contained ASS script with the caption style baked in
+
+    The default play resolution matches what ffmpeg assigns converted SRT
+    files, so captions look the same as the old force_style overrides.
+    """
+    style = {**ASS_STYLE, **(style or {})}
+    header = (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {width}\n"
+        f"PlayResY: {height}\n"
+        "WrapStyle: 0\n\n"
+        "[V4+ Styles]\n"
+        f"Format: Name, {', '.join(style)}\n"
+        f"Style: Default,{','.join(str(v) for v in style.values())}\n\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+    events = ''.join(
+        f"Dialogue: 0,{format_ass_time(start)},{format_ass_time(end)},Default,,0,0,0,,"
+        f"{text.replace('{', '(').replace('}', ')')}\n"
+        for start, end, text in cues
+    )
+    return header + events
@@ -1,10 +1,21 @@
+import argparse
+import hashlib
 import json
 import os
-import requests
+from pathlib import Path
+import clients
 
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 JSON_FILE = "kyrios_codex_trend_protocol.json"
+# Fingerprints of the last successful sync per database; unchanged schemas skip the network
+STATE_FILE = os.getenv("NOTION_SYNC_STATE", "output/notion_sync_state.json")
+# Properties per PATCH; keeps big schemas well under Notion's request size limits
+BATCH_PROPERTIES = 25
+ICON = "🌌"
+
+# Properties that already exist on the database and must not be redefined
+SKIPPED_PROPERTIES = ["Codex Reference", "Product or Offering"]
 
 headers = {
     "Authorization": f"Bearer {NOTION_API_KEY}",
@@ -12,60 +23,150 @@ headers = {
     "Notion-Version": "2022-06-28"
 }
 
-def create_or_update_database():
-    with open(JSON_FILE, "r") as f:
-        schema = json.load(f)
-
-    url = f"https://api.notion.com/v1/databases/{NOTION_DATABASE_ID}"
-
-    # Title & emoji update
-    body = {
-        "title": [{"type": "text", "text": {"content": schema['title']}}],
-        "icon": {"emoji": "🌌"},
-        "properties": {}
-    }
-
+def desired_properties(schema):
+    """Notion property configs for the trend protocol schema"""
+    properties = {}
     for key, value in schema['schema'].items():
         prop_type = value.get('type', 'rich_text')
 
         # Skip invalid or pre-existing title props
         if key.lower() in ["title", "name"]:
             continue
-        if key in ["Codex Reference", "Product or Offering"]:
+        if key in SKIPPED_PROPERTIES:
             continue
 
         # Map supported property types
-        if prop_type == "multi_select":
-            body["properties"][key] = {
-                "multi_select": {
-                    "options": [{"name": o} for o in value.get("options", [])]
-                }
-            }
-        elif prop_type == "select":
-            body["properties"][key] = {
-                "select": {
-                    "options": [{"name": o} for o in value.get("options", [])]
-                }
-            }
+        if prop_type in ("multi_select", "select"):
+            properties[key] = {prop_type: {"options": [{"name": o} for o in value.get("options", [])]}}
         elif prop_type == "number":
-            body["properties"][key] = {"number": {"format": "number"}}
+            properties[key] = {"number": {"format": "number"}}
         elif prop_type == "date":
-            body["properties"][key] = {"date": {}}
-        elif prop_type == "rich_text":
-            body["properties"][key] = {"rich_text": {}}
+            properties[key] = {"date": {}}
         elif prop_type == "formula":
-            body["properties"][key] = {
-                "formula": {"expression": value.get("expression", "0")}
-            }
+            properties[key] = {"formula": {"expression": value.get("expression", "0")}}
         else:
-            body["properties"][key] = {"rich_text": {}}
+            properties[key] = {"rich_text": {}}
+    return properties
+
+def _plain_title(title):
+    return "".join(part.get("plain_text") or part.get("text", {}).get("content", "") for part in title or [])
+
+def diff_properties(current, desired):
+    """Minimal property patch turning the database's `current` schema into `desired`
+
+    Missing properties and type changes are sent whole. Select options are
+    only ever added: the patch repeats the existing options (by id, so their
+    colours and the pages using them are untouched) plus the missing names.
+    """
+    patch = {}
+    for key, config in desired.items():
+        prop_type = next(iter(config))
+        existing = current.get(key)
+        if existing is None or existing.get("type") != prop_type:
+            patch[key] = config
+            continue
+        have = existing.get(prop_type) or {}
+        want = config[prop_type]
+        if prop_type in ("select", "multi_select"):
+            names = {o["name"] for o in have.get("options", [])}
+            missing = [o for o in want["options"] if o["name"] not in names]
+            if missing:
+                kept = [{"id": o["id"]} if "id" in o else {"name": o["name"]} for o in have.get("options", [])]
+                patch[key] = {prop_type: {"options": kept + missing}}
+        elif prop_type == "number":
+            if have.get("format") != want["format"]:
+                patch[key] = config
+        elif prop_type == "formula":
+            if have.get("expression") != want["expression"]:
+                patch[key] = config
+    return patch
+
+def fingerprint(database_id, title, properties):
+    blob = json.dumps([database_id, title, ICON, properties], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
 
-    response = requests.patch(url, headers=headers, data=json.dumps(body))
+def _load_state():
+    try:
+        with open(STATE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    if response.status_code == 200:
+def _save_fingerprint(database_id, value):
+    state = _load_state()
+    state[database_id] = value
+    Path(STATE_FILE).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{STATE_FILE}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
+
+def _notion(method, url, body=None):
+    response = clients.request("notion", method, url, headers=headers,
+                               data=json.dumps(body) if body is not None else None)
+    if response.status_code != 200:
+        raise RuntimeError(f"{method} {url} failed ({response.status_code}): {response.text}")
+    return response.json()
+
+def sync_database(database_id, json_file=JSON_FILE, force=False):
+    """Bring one database in line with a schema file; returns the number of PATCHes sent"""
+    with open(json_file, "r") as f:
+        schema = json.load(f)
+    properties = desired_properties(schema)
+    current_fingerprint = fingerprint(database_id, schema['title'], properties)
+    if not force and _load_state().get(database_id) == current_fingerprint:
+        print(f"⏭️ {database_id}: {json_file} unchanged since the last sync")
+        return 0
+
+    url = f"https://api.notion.com/v1/databases/{database_id}"
+    database = _notion("GET", url)
+
+    # Title & emoji update, only when they differ
+    header = {}
+    if _plain_title(database.get("title")) != schema['title']:
+        header["title"] = [{"type": "text", "text": {"content": schema['title']}}]
+    if (database.get("icon") or {}).get("emoji") != ICON:
+        header["icon"] = {"emoji": ICON}
+
+    patch = diff_properties(database.get("properties", {}), properties)
+    keys = list(patch)
+    batches = [keys[i:i + BATCH_PROPERTIES] for i in range(0, len(keys), BATCH_PROPERTIES)]
+    if header and not batches:
+        batches = [[]]
+    for index, batch in enumerate(batches):
+        body = {"properties": {key: patch[key] for key in batch}}
+        if index == 0:
+            body.update(header)
+        _notion("PATCH", url, body)
+
+    _save_fingerprint(database_id, current_fingerprint)
+    print(f"✅ {database_id}: {len(keys)} properties changed in {len(batches)} request(s)"
+          + ("" if batches else " — already up to date"))
+    return len(batches)
+
+def create_or_update_database():
+    try:
+        sync_database(NOTION_DATABASE_ID, JSON_FILE)
         print("✅ Notion sync complete — Trend Protocol database updated successfully.")
-    else:
-        print(f"❌ Error: {response.text}")
+    except RuntimeError as e:
+        print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    create_or_update_database()
+    parser = argparse.ArgumentParser(description="Sync trend protocol schemas into Notion databases")
+    parser.add_argument("--database", action="append", metavar="ID=FILE",
+                        help="Database and schema file to sync (repeatable; default NOTION_DATABASE_ID and " + JSON_FILE + ")")
+    parser.add_argument("--force", action="store_true", help="Ignore stored fingerprints and re-check every database")
+    args = parser.parse_args()
+
+    if not args.database:
+        create_or_update_database()
+    else:
+        failed = False
+        for pair in args.database:
+            database_id, _, json_file = pair.partition("=")
+            try:
+                sync_database(database_id, json_file or JSON_FILE, force=args.force)
+            except RuntimeError as e:
+                print(f"❌ {database_id}: {e}")
+                failed = True
+        raise SystemExit(1 if failed else 0)
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from artifact_manager import partial_path
+from batch_runner import _StreamStarter
+
+
+def test_streamed_uploads_start_with_their_encodes(tmp_path):
+    started = {}
+
+    def upload(video_path, content, finished):
+        started[content['title']] = time.monotonic()
+        return content['title']
+
+    encodes = {title: Future() for title in ('first', 'second')}
+    paths = {title: tmp_path / f'{title}.mp4' for title in encodes}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        starter = _StreamStarter(pool, upload, poll_seconds=0.01)
+        for title, encode in encodes.items():
+            starter.add(paths[title], {'title': title}, encode, {'job': title})
+
+        # Only the first encode has started; the second waits for an encode worker
+        paths['first'].touch()
+        os.link(paths['first'], partial_path(paths['first']))
+        time.sleep(0.3)
+        assert list(started) == ['first']
+
+        second_start = time.monotonic()
+        paths['second'].touch()
+        os.link(paths['second'], partial_path(paths['second']))
+        for encode in encodes.values():
+            encode.set_result(None)
+        futures = starter.close()
+
+        assert sorted(future.result() for future in futures) == ['first', 'second']
+    assert started['second'] >= second_start
+    assert sorted(result['job'] for result, _ in futures.values()) == ['first', 'second']
+
+
+def test_streamed_upload_starts_when_encode_fails_early(tmp_path):
+    calls = threading.Event()
+    encode = Future()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        starter = _StreamStarter(pool, lambda *args: calls.set(), poll_seconds=0.01)
+        starter.add(tmp_path / 'never.mp4', {'title': 'x'}, encode, {'job': 0})
+        encode.set_exception(RuntimeError('ffmpeg failed'))
+        starter.close()
+    assert calls.is_set()
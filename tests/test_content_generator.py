@@ -0,0 +1,126 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from content_generator import ContentGenerator, iter_json_items
+from dedupe_index import DedupeIndex
+from trend_index import TrendIndex
+
+TEACHINGS = [
+    {'theme': 'inner peace', 'title': 'The Still Lake',
+     'script': 'Let your mind settle like a lake at dusk. Breathe out slowly three times and notice what remains.',
+     'visual_prompt': 'a calm lake at dusk'},
+    {'theme': 'gratitude', 'title': 'Three Small Gifts',
+     'script': 'Before you sleep tonight, name three small gifts from today. Gratitude turns ordinary hours into blessings.',
+     'visual_prompt': 'candlelight over an open journal'},
+    {'theme': 'presence', 'title': 'Feet On The Earth',
+     'script': 'Feel the weight of your feet on the ground right now. Every step you take can be a quiet homecoming.',
+     'visual_prompt': 'bare feet on morning grass'},
+]
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class StubClient:
+    """Stands in for OpenAI's client: streams canned text in the given pieces"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=200)
+        return iter([chunk(piece) for piece in self.pieces] + [chunk(usage=usage)])
+
+
+@pytest.fixture
+def generator_for(tmp_path):
+    def build(pieces, **kwargs):
+        return ContentGenerator(
+            client=StubClient(pieces),
+            trends=TrendIndex(tmp_path / 'trends.sqlite3', sources=[]),
+            dedupe=DedupeIndex(tmp_path / 'dedupe.sqlite3'),
+            **kwargs,
+        )
+    return build
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 10_000])
+def test_iter_json_items_any_chunking(size):
+    text = 'Here you go:\n```json\n' + json.dumps(TEACHINGS, indent=2) + '\n```\nEnjoy!'
+    assert list(iter_json_items(split(text, size))) == TEACHINGS
+
+
+def test_iter_json_items_yields_each_object_as_it_closes():
+    first = json.dumps(TEACHINGS[0])
+    pieces = iter(['[', first[:10], first[10:], ', ', json.dumps(TEACHINGS[1])[:5]])
+    items = iter_json_items(pieces)
+    assert next(items) == TEACHINGS[0]
+    # Out as soon as its closing brace arrived, before anything after it was read
+    assert list(pieces) == [', ', json.dumps(TEACHINGS[1])[:5]]
+
+
+def test_iter_json_items_braces_inside_strings():
+    items = [{'script': 'a } tricky { string ]', 'title': '[x]'}, {'script': 'b'}]
+    assert list(iter_json_items(split(json.dumps(items), 2))) == items
+
+
+def test_iter_json_items_stops_at_end_of_array():
+    text = json.dumps(TEACHINGS[:1]) + ' and also [{"ignored": true}]'
+    assert list(iter_json_items(split(text, 4))) == TEACHINGS[:1]
+
+
+def test_generate_batch_split_tokens(generator_for):
+    # Token-sized pieces that cut through keys, escapes and multi-byte characters
+    items = [dict(TEACHINGS[0], title='Stillness — “the lake”'), *TEACHINGS[1:]]
+    generator = generator_for(split(json.dumps(items), 3))
+    themes = [item['theme'] for item in items]
+
+    batch = list(generator.generate_batch(3, themes=themes))
+
+    assert [content['title'] for content in batch] == [item['title'] for item in items]
+    assert [content['theme'] for content in batch] == themes
+    assert generator.usage == {'requests': 1, 'prompt_tokens': 100, 'completion_tokens': 200,
+                               'items': 3, 'rejected': 0}
+    request = generator.client.requests[0]
+    assert request['stream'] is True
+    assert all(theme in request['messages'][1]['content'] for theme in themes)
+
+
+def test_generate_batch_rejects_malformed_and_repeats(generator_for):
+    near_repeat = dict(TEACHINGS[1], script=TEACHINGS[1]['script'] + ' Truly.')
+    items = [TEACHINGS[0], {'title': 'no script'}, 'not an object', near_repeat, TEACHINGS[2]]
+    generator = generator_for(split(json.dumps(items), 16), recent_scripts=[TEACHINGS[1]['script']])
+
+    batch = list(generator.generate_batch(5, themes=['inner peace', 'gratitude', 'presence']))
+
+    assert [content['title'] for content in batch] == [TEACHINGS[0]['title'], TEACHINGS[2]['title']]
+    assert generator.usage['rejected'] == 3
+
+
+def test_generate_batch_salvages_plain_text(generator_for):
+    text = "TITLE: Breathe\nSCRIPT: Breathe in for four counts,\nhold for four, and release.\nVISUAL_PROMPT: dawn sky"
+    generator = generator_for(split(text, 5))
+
+    batch = list(generator.generate_batch(2, themes=['breath', 'calm']))
+
+    assert batch == [{'title': 'Breathe', 'script': 'Breathe in for four counts, hold for four, and release.',
+                      'visual_prompt': 'dawn sky', 'theme': 'breath'}]
+
+
+def test_generate_content_sizes_batches_to_what_is_wanted(generator_for, monkeypatch):
+    generator = generator_for(split(json.dumps(TEACHINGS[:1]), 8), batch_size=5)
+    monkeypatch.setattr(generator.trends, 'select', lambda count, exclude=(): ['inner peace'] * count)
+
+    assert generator.generate_content(wanted=1)['title'] == TEACHINGS[0]['title']
+    assert '1 different' in generator.client.requests[0]['messages'][1]['content']
@@ -0,0 +1,140 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import job_queue
+from config import Config
+from job_queue import JobQueue, posting_slots, schedule
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / 'jobs.sqlite3')
+
+
+def test_stages_run_in_order(queue):
+    job_id = queue.enqueue(time.time())
+    for stage in job_queue.STAGES:
+        job = queue.claim(stage)
+        assert job['id'] == job_id
+        queue.complete(job_id, {**job['payload'], stage: True})
+    done = queue.get(job_id)
+    assert (done['stage'], done['status']) == (job_queue.DONE, 'done')
+    assert set(done['payload']) == set(job_queue.STAGES)
+
+
+def test_claimed_job_is_leased(queue):
+    queue.enqueue(time.time())
+    assert queue.claim('content') is not None
+    assert queue.claim('content') is None
+
+
+def test_recover_returns_expired_leases(queue):
+    job_id = queue.enqueue(time.time())
+    queue.claim('content', lease_seconds=0.01)
+    other = queue.enqueue(time.time() + 60)
+    queue.claim('content', lease_seconds=3600)
+    time.sleep(0.05)
+
+    assert queue.recover() == 1  # only the expired lease
+    job = queue.get(job_id)
+    assert (job['status'], job['lease_until']) == ('pending', None)
+    assert queue.get(other)['status'] == 'running'
+    again = queue.claim('content')
+    assert again['id'] == job_id
+    assert again['attempts'] == 2
+
+
+def test_fail_backs_off_then_gives_up(queue, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_ATTEMPTS', 3)
+    job_id = queue.enqueue(time.time())
+    delays = []
+    for attempt in range(1, 4):
+        with queue._db() as db:  # skip the backoff wait
+            db.execute("UPDATE jobs SET next_attempt_at = 0 WHERE id = ?", (job_id,))
+        assert queue.claim('content')['attempts'] == attempt
+        before = time.time()
+        status = queue.fail(job_id, RuntimeError(f"attempt {attempt}"))
+        job = queue.get(job_id)
+        if attempt < 3:
+            assert status == 'pending'
+            assert queue.claim('content') is None  # still backing off
+            delays.append(job['next_attempt_at'] - before)
+        else:
+            assert status == 'failed'
+            assert job['error'] == 'attempt 3'
+
+    assert delays == pytest.approx([30, 60], abs=1)
+
+
+def test_uploads_wait_for_their_slot(queue):
+    job_id = queue.enqueue(time.time() + 3600)
+    for stage in job_queue.STAGES[:-1]:
+        queue.complete(queue.claim(stage)['id'], {})
+    assert queue.claim('upload') is None
+    assert queue.active(['upload']) == 0
+
+    with queue._db() as db:
+        db.execute("UPDATE jobs SET publish_at = ? WHERE id = ?", (time.time() - 1, job_id))
+    assert queue.claim('upload')['id'] == job_id
+
+
+def test_posting_slots_are_aligned():
+    now = 1_700_000_000 + 123
+    slots = posting_slots(now, ahead=3, interval_hours=8)
+    assert slots == [1_700_006_400, 1_700_035_200, 1_700_064_000]
+    assert all(slot % (8 * 3600) == 0 for slot in slots)
+    assert posting_slots(slots[0], ahead=1, interval_hours=8) == [slots[0]]
+
+
+def test_schedule_fills_each_slot_once(queue, monkeypatch):
+    monkeypatch.setattr(Config, 'POST_INTERVAL_HOURS', 8)
+    monkeypatch.setattr(Config, 'SCHEDULE_AHEAD_SLOTS', 3)
+    now = 1_700_000_000
+    created = schedule(queue, now)
+    assert len(created) == 3
+    assert [queue.get(job_id)['publish_at'] for job_id in created] == posting_slots(now)
+
+    assert schedule(queue, now) == []  # slots that have a job are left alone
+    later = schedule(queue, now + 8 * 3600)
+    assert [queue.get(job_id)['publish_at'] for job_id in later] == [posting_slots(now + 8 * 3600)[-1]]
+
+
+def test_retried_upload_does_not_publish_again(queue, monkeypatch):
+    import artifact_manager
+    import content_generator
+    import empire_engine
+    import youtube_publisher
+
+    published = []
+
+    class Publisher:
+        def publish(self, video_path, content, finished=None):
+            published.append(video_path)
+            return 'vid-1'
+
+    failures = [RuntimeError('dedupe index locked')]  # the step after publish fails once
+
+    def record_posted(content):
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(youtube_publisher, 'YouTubePublisher', Publisher)
+    monkeypatch.setattr(content_generator, 'record_posted', record_posted)
+    monkeypatch.setattr(artifact_manager, 'get_artifacts', lambda: SimpleNamespace(release=lambda job_id: None))
+
+    job_id = queue.enqueue(time.time())
+    for stage in job_queue.STAGES[:-1]:
+        queue.complete(queue.claim(stage)['id'], {'video': 'v.mp4', 'content': {'script': 's'}})
+
+    with pytest.raises(RuntimeError):
+        empire_engine.stage_upload(queue.claim('upload'), queue)
+    queue.fail(job_id, 'dedupe index locked')
+    assert queue.get(job_id)['payload']['video_id'] == 'vid-1'
+    with queue._db() as db:  # skip the backoff wait
+        db.execute("UPDATE jobs SET next_attempt_at = 0 WHERE id = ?", (job_id,))
+
+    payload = empire_engine.stage_upload(queue.claim('upload'), queue)
+    assert payload['video_id'] == 'vid-1'
+    assert published == ['v.mp4']
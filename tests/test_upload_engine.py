@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaFileUpload, build_http
+
+from artifact_manager import partial_path
+from fake_youtube import FakeYouTubeServer
+from upload_engine import GrowingFileUpload, ResumableUploader, is_retriable
+
+CHUNK = 256 * 1024
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(os.urandom(CHUNK * 3 + 1000))
+    return path
+
+
+def insert_request(server, media):
+    """A videos.insert-style resumable request against the fake server"""
+    return HttpRequest(
+        build_http(),  # as build() makes it: 308 is resumable progress, not a redirect
+        lambda resp, content: json.loads(content),
+        f"{server.url}/upload/youtube/v3/videos?uploadType=resumable&part=snippet",
+        method='POST',
+        body=json.dumps({'snippet': {'title': 'test'}}),
+        headers={'content-type': 'application/json'},
+        resumable=media,
+    )
+
+
+def uploader(tmp_path, **kwargs):
+    return ResumableUploader(state_path=tmp_path / 'sessions.json', sleep=lambda seconds: None, **kwargs)
+
+
+def test_retries_server_errors(tmp_path, video):
+    with FakeYouTubeServer(failures=[503, 500]) as server:
+        media = MediaFileUpload(str(video), mimetype='video/mp4', chunksize=CHUNK, resumable=True)
+        response, stats = uploader(tmp_path).upload(insert_request(server, media), video)
+
+    assert server.uploads[response['id']] == video.read_bytes()
+    assert stats['retries'] == 2
+    assert stats['bytes'] == video.stat().st_size
+
+
+def test_gives_up_after_max_retries(tmp_path, video):
+    with FakeYouTubeServer(failures=[503, 503, 503]) as server:
+        media = MediaFileUpload(str(video), mimetype='video/mp4', chunksize=CHUNK, resumable=True)
+        with pytest.raises(HttpError):
+            uploader(tmp_path, max_retries=2).upload(insert_request(server, media), video)
+    assert not server.uploads
+
+
+def test_resumes_saved_session(tmp_path, video):
+    def stop_after_first_chunk(progress, total):
+        raise Interrupted
+
+    with FakeYouTubeServer() as server:
+        media = MediaFileUpload(str(video), mimetype='video/mp4', chunksize=CHUNK, resumable=True)
+        with pytest.raises(Interrupted):
+            uploader(tmp_path).upload(insert_request(server, media), video, on_progress=stop_after_first_chunk)
+        assert uploader(tmp_path).saved_session(video)
+        assert server.bytes_received == CHUNK
+
+        # A new process: fresh request and uploader, same session state file
+        media = MediaFileUpload(str(video), mimetype='video/mp4', chunksize=CHUNK, resumable=True)
+        response, stats = uploader(tmp_path).upload(insert_request(server, media), video)
+
+    assert server.uploads[response['id']] == video.read_bytes()
+    assert server.bytes_received == video.stat().st_size  # nothing was sent twice
+    assert len(server.sessions) == 1
+    assert uploader(tmp_path).saved_session(video) is None
+
+
+def encoder(path, data, finished, delay=0):
+    """A writer thread with the renderer's protocol: a .part link while the file is written"""
+    def encode():
+        time.sleep(delay)  # queued behind other encodes
+        with open(path, 'wb') as f:
+            os.link(path, partial_path(path))
+            for start in range(0, len(data), 100_000):
+                f.write(data[start:start + 100_000])
+                f.flush()
+                time.sleep(0.02)
+        os.unlink(partial_path(path))
+        finished.set()
+
+    return threading.Thread(target=encode)
+
+
+def test_uploads_growing_file(tmp_path):
+    path = tmp_path / 'master.mp4'
+    data = os.urandom(CHUNK * 2 + 5000)
+    finished = threading.Event()
+    writer = encoder(path, data, finished)
+    with FakeYouTubeServer() as server:
+        media = GrowingFileUpload(path, finished.is_set, chunksize=CHUNK, poll_seconds=0.01)
+        writer.start()
+        try:
+            response, stats = uploader(tmp_path).upload(insert_request(server, media), path)
+        finally:
+            media.close()
+            writer.join()
+
+    assert server.uploads[response['id']] == data
+    assert stats['bytes'] == len(data)
+    assert not (tmp_path / 'sessions.json').exists()  # growing uploads are never resumed
+
+
+def test_growing_file_of_whole_chunks(tmp_path):
+    path = tmp_path / 'master.mp4'
+    data = os.urandom(CHUNK * 2)  # the last chunk is a full one, so must carry the total itself
+    finished = threading.Event()
+    writer = encoder(path, data, finished)
+    with FakeYouTubeServer() as server:
+        media = GrowingFileUpload(path, finished.is_set, chunksize=CHUNK, poll_seconds=0.01)
+        writer.start()
+        try:
+            response, _ = uploader(tmp_path, max_retries=0).upload(insert_request(server, media), path)
+        finally:
+            media.close()
+            writer.join()
+
+    assert server.uploads[response['id']] == data
+
+
+def test_growing_file_waits_for_late_encode(tmp_path):
+    path = tmp_path / 'master.mp4'
+    data = os.urandom(CHUNK + 5000)
+    finished = threading.Event()
+    writer = encoder(path, data, finished, delay=0.5)
+    with FakeYouTubeServer() as server:
+        # Waiting for the encode to start is not a stall
+        media = GrowingFileUpload(path, finished.is_set, chunksize=CHUNK, poll_seconds=0.01, stall_seconds=0.2)
+        writer.start()
+        try:
+            response, _ = uploader(tmp_path).upload(insert_request(server, media), path)
+        finally:
+            media.close()
+            writer.join()
+
+    assert server.uploads[response['id']] == data
+
+
+def test_growing_file_fails_when_render_fails(tmp_path):
+    path = tmp_path / 'master.mp4'
+    with FakeYouTubeServer() as server:
+        media = GrowingFileUpload(path, lambda: True, chunksize=CHUNK, poll_seconds=0.01)
+        with pytest.raises(RuntimeError, match='was not rendered'):
+            uploader(tmp_path).upload(insert_request(server, media), path)
+
+
+def test_only_transport_errors_are_retried():
+    assert is_retriable(ConnectionResetError())
+    assert is_retriable(TimeoutError())
+    assert not is_retriable(FileNotFoundError())
+    assert not is_retriable(PermissionError())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tracing - Per-stage spans, JSONL trace log and a Prometheus-style endpoint
+Each span records wall and CPU time, peak RSS growth, bytes written and
+subprocess spawns; finished spans are appended to TRACE_FILE and aggregated for /metrics
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from config import Config
+import clients
+import process_runner
+from clients import LatencyHistogram
+
+# ru_maxrss is KiB on Linux (bytes on macOS)
+_RSS_UNIT = 1024
+
+_current = contextvars.ContextVar('span', default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_write_lock = threading.Lock()
+_stages = {}
+_started = time.time()
+_gauges = {}
+
+
+class _StageTotals:
+    """Aggregates of every finished span with one name"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.cpu = 0.0
+        self.child_cpu = 0.0
+        self.bytes_written = 0
+        self.spawns = 0
+
+
+def _io_written():
+    """Bytes this process has written to storage (0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/io', 'rb') as f:
+            for line in f:
+                if line.startswith(b'write_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _sample():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'wall': time.perf_counter(),
+        'cpu': time.thread_time(),
+        'child_cpu': children.ru_utime + children.ru_stime,
+        'bytes': _io_written(),
+        'spawns': process_runner.spawn_total(),
+        'rss': own.ru_maxrss * _RSS_UNIT,
+        'child_rss': children.ru_maxrss * _RSS_UNIT,
+    }
+
+
+def current():
+    """The innermost open span on this thread/context, or None"""
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """Trace one stage; nested spans share the trace id of the outermost one
+
+    Process-wide counters (bytes written, spawns, child CPU) are deltas over
+    the span, so spans that overlap in other threads are included in them.
+    The kernel only keeps peak RSS for the whole process, so a span records
+    how far it raised that peak (`rss_growth_mb`, 0 if the process had been
+    bigger before) next to the peak itself (`process_peak_rss_mb`).
+    Use `contextvars.copy_context().run` to carry the parent into a pool.
+    """
+    parent = _current.get()
+    record = {
+        'name': name,
+        'trace_id': parent['trace_id'] if parent else os.urandom(8).hex(),
+        'span_id': next(_ids),
+        'parent_id': parent['span_id'] if parent else None,
+        'start': time.time(),
+        'attrs': attrs,
+    }
+    token = _current.set(record)
+    before = _sample()
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        after = _sample()
+        record.update({
+            'wall_s': after['wall'] - before['wall'],
+            'cpu_s': after['cpu'] - before['cpu'],
+            'child_cpu_s': after['child_cpu'] - before['child_cpu'],
+            'bytes_written': after['bytes'] - before['bytes'],
+            'spawns': after['spawns'] - before['spawns'],
+            'rss_growth_mb': (after['rss'] - before['rss']) / 1e6,
+            'process_peak_rss_mb': after['rss'] / 1e6,
+            'children_peak_rss_mb': after['child_rss'] / 1e6,
+            'error': error,
+        })
+        _finish(record)
+
+
+def _finish(record):
+    with _lock:
+        totals = _stages.setdefault(record['name'], _StageTotals())
+    totals.latency.observe(record['wall_s'])
+    if record['error']:
+        totals.latency.note('errors')
+    with totals.latency.lock:
+        totals.cpu += record['cpu_s']
+        totals.child_cpu += record['child_cpu_s']
+        totals.bytes_written += record['bytes_written']
+        totals.spawns += record['spawns']
+
+    if Config.TRACE_FILE:
+        line = json.dumps(record, default=str)
+        with _write_lock:
+            path = Path(Config.TRACE_FILE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def set_gauge(name, value, **labels):
+    """Publish an extra gauge (e.g. queue depth) on /metrics"""
+    with _lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+
+def stage_report():
+    """{span name: latency snapshot plus CPU, bytes and spawns}"""
+    with _lock:
+        stages = list(_stages.items())
+    return {
+        name: {**t.latency.snapshot(), 'cpu_s': t.cpu, 'child_cpu_s': t.child_cpu,
+               'bytes_written': t.bytes_written, 'spawns': t.spawns}
+        for name, t in stages
+    }
+
+
+def _labels(**labels):
+    inner = ','.join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels.items())
+    return f'{{{inner}}}' if inner else ''
+
+
+def _histogram_lines(metric, labels, snapshot):
+    lines = []
+    cumulative = 0
+    for bound, count in snapshot['buckets'].items():
+        cumulative += count
+        le = '+Inf' if bound == float('inf') else repr(float(bound))
+        lines.append(f"{metric}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{metric}_sum{_labels(**labels)} {snapshot['sum']:.6f}")
+    lines.append(f"{metric}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+
+def render_metrics():
+    """Prometheus text exposition of stage spans, API latencies and process stats"""
+    lines = ['# TYPE empire_stage_seconds histogram']
+    stages = stage_report()
+    for name, snap in sorted(stages.items()):
+        lines += _histogram_lines('empire_stage_seconds', {'stage': name}, snap)
+    for metric, field in (('empire_stage_cpu_seconds_total', 'cpu_s'),
+                          ('empire_stage_child_cpu_seconds_total', 'child_cpu_s'),
+                          ('empire_stage_bytes_written_total', 'bytes_written'),
+                          ('empire_stage_spawns_total', 'spawns'),
+                          ('empire_stage_errors_total', 'errors')):
+        lines.append(f'# TYPE {metric} counter')
+        lines += [f"{metric}{_labels(stage=name)} {snap[field]}" for name, snap in sorted(stages.items())]
+
+    lines.append('# TYPE empire_api_seconds histogram')
+    api = clients.latency_report()
+    for endpoint, snap in sorted(api.items()):
+        lines += _histogram_lines('empire_api_seconds', {'endpoint': endpoint}, snap)
+    lines.append('# TYPE empire_api_retries_total counter')
+    lines += [f"empire_api_retries_total{_labels(endpoint=e)} {s['retries']}" for e, s in sorted(api.items())]
+
+    lines.append('# TYPE empire_process_spawns_total counter')
+    lines += [f"empire_process_spawns_total{_labels(executable=exe)} {count}"
+              for exe, count in sorted(process_runner.spawn_counts().items())]
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    lines += [
+        '# TYPE empire_process_cpu_seconds_total counter',
+        f"empire_process_cpu_seconds_total {usage.ru_utime + usage.ru_stime:.3f}",
+        '# TYPE empire_process_peak_rss_bytes gauge',
+        f"empire_process_peak_rss_bytes {usage.ru_maxrss * _RSS_UNIT}",
+        '# TYPE empire_uptime_seconds gauge',
+        f"empire_uptime_seconds {time.time() - _started:.1f}",
+    ]
+    with _lock:
+        gauges = sorted(_gauges.items())
+    for (name, labels), value in gauges:
+        lines.append(f"{name}{_labels(**dict(labels))} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def _metrics_handler():
+    """Request handler class (http.server is only imported by processes that serve)"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith('/metrics'):
+                body = render_metrics().encode('utf-8')
+                content_type = 'text/plain; version=0.0.4'
+            elif self.path.startswith('/health'):
+                body = json.dumps({'status': 'ok', 'pid': os.getpid(),
+                                   'uptime_seconds': round(time.time() - _started, 1)}).encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _MetricsHandler
+
+
+def serve_metrics(port=None, host='0.0.0.0'):
+    """Serve /metrics and /health from a daemon thread; returns the server"""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host, Config.METRICS_PORT if port is None else port), _metrics_handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Trend Index - Local SQLite ranking of content themes
+Themes come from the trend protocol JSON / Notion exports and from our own upload
+history; each is ranked by recency-weighted performance and kept apart from
+near-duplicate topics with 64-bit SimHash fingerprints
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from config import Config
+
+# Signals are weighted by exp((t - EPOCH) / tau): every weight decays at the same
+# rate, so the stored log-priority never has to be recomputed as time passes
+EPOCH = 1704067200.0  # 2024-01-01 UTC
+THEME_KEYS = ('theme', 'topic', 'trend', 'category', 'niche')
+NAME_FIELDS = ('name', 'title', 'theme', 'topic', 'trend')
+SCORE_FIELDS = ('score', 'momentum', 'views', 'engagement', 'performance')
+TIME_FIELDS = ('date', 'updated', 'last_edited_time', 'published', 'created_time')
+STOPWORDS = frozenset('a an and the of for to in on with your our my is are be into from by at as'.split())
+# SimHash bands, low bits first. Two fingerprints within d bits differ in at most
+# d // len(BANDS) bits of some band, so only themes near in one band are compared
+BANDS = (13, 13, 13, 13, 12)
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS themes (
+    name TEXT PRIMARY KEY,
+    simhash INTEGER NOT NULL,
+    trend_log REAL NOT NULL DEFAULT -1e308,
+    history_log REAL NOT NULL DEFAULT -1e308,
+    priority REAL NOT NULL DEFAULT -1e308,
+    last_used REAL NOT NULL DEFAULT 0,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS themes_rank ON themes (priority DESC);
+CREATE INDEX IF NOT EXISTS themes_used ON themes (last_used);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def simhash(text):
+    """64-bit SimHash of a topic's content words (signed, to fit SQLite INTEGER)"""
+    words = [w.rstrip('s') if len(w) > 3 else w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    weights = [0] * 64
+    for feature in features or [text.lower()]:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def bands(fingerprint):
+    """The BANDS slices of a fingerprint, as non-negative integers"""
+    value, slices = fingerprint & 0xFFFFFFFFFFFFFFFF, []
+    for width in BANDS:
+        slices.append(value & ((1 << width) - 1))
+        value >>= width
+    return slices
+
+
+@lru_cache(maxsize=None)
+def _flips(width, radius):
+    """XOR masks turning a `width`-bit value into each value within `radius` bits of it"""
+    return tuple(sum(1 << bit for bit in bits)
+                 for flips in range(radius + 1) for bits in itertools.combinations(range(width), flips))
+
+
+def distance(a, b):
+    """Hamming distance between two fingerprints"""
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def _log_weight(score, at):
+    """log(score * exp((at - EPOCH) / tau)), tau from TREND_HALF_LIFE_DAYS"""
+    tau = Config.TREND_HALF_LIFE_DAYS * 86400 / math.log(2)
+    return math.log(max(score, 1e-9)) + (at - EPOCH) / tau
+
+
+def _logaddexp(a, b):
+    high, low = max(a, b), min(a, b)
+    if low <= -1e300:
+        return high
+    return high + math.log1p(math.exp(low - high))
+
+
+def _timestamp(value, default):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        value = value.get('start')
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _field(record, names):
+    lowered = {str(k).lower(): v for k, v in record.items()}
+    for name in names:
+        if lowered.get(name) not in (None, ''):
+            return lowered[name]
+    return None
+
+
+def _notion_page(page, default_at):
+    """(name, score, at) of a page from a Notion database query export"""
+    name, score = None, None
+    for prop in page.get('properties', {}).values():
+        kind = prop.get('type')
+        if kind == 'title' and name is None:
+            name = ''.join(part.get('plain_text', '') for part in prop.get('title', []))
+        elif kind == 'number' and score is None:
+            score = prop.get('number')
+    return name, score, _timestamp(page.get('last_edited_time'), default_at)
+
+
+def read_trends(path):
+    """(name, score, timestamp) records from a trend JSON, a Notion export or a CSV"""
+    path = Path(path)
+    default_at = path.stat().st_mtime
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rows = []
+        if isinstance(data, dict):
+            # Trend protocol schema: select options of theme-like properties seed the index
+            for key, prop in (data.get('schema') or {}).items():
+                if any(word in key.lower() for word in THEME_KEYS):
+                    rows += [{'name': option} for option in prop.get('options', [])]
+            data = data.get('trends') or data.get('results') or []
+        rows += data if isinstance(data, list) else []
+
+    records = []
+    for row in rows:
+        if isinstance(row, str):
+            name, score, at = row, None, default_at
+        elif isinstance(row, dict) and row.get('object') == 'page':
+            name, score, at = _notion_page(row, default_at)
+        elif isinstance(row, dict):
+            name = _field(row, NAME_FIELDS)
+            score = _number(_field(row, SCORE_FIELDS))
+            at = _timestamp(_field(row, TIME_FIELDS), default_at)
+        else:
+            continue
+        name = ' '.join(str(name or '').split())
+        if name:
+            records.append((name, score if score and score > 0 else 1.0, at))
+    return records
+
+
+class TrendIndex:
+    def __init__(self, path=None, sources=None):
+        self.path = Path(path or Config.TREND_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sources = Config.TREND_SOURCES if sources is None else sources
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+            self._add_band_columns(db)
+
+    @staticmethod
+    def _add_band_columns(db):
+        """Band lookup columns (and their indexes), backfilled for indexes created before them"""
+        columns = {row['name'] for row in db.execute("PRAGMA table_info(themes)")}
+        missing = [i for i in range(len(BANDS)) if f'band{i}' not in columns]
+        for i in missing:
+            db.execute(f"ALTER TABLE themes ADD COLUMN band{i} INTEGER NOT NULL DEFAULT 0")
+        if missing:
+            assignments = ', '.join(f'band{i} = ?' for i in range(len(BANDS)))
+            for row in db.execute("SELECT name, simhash FROM themes").fetchall():
+                db.execute(f"UPDATE themes SET {assignments} WHERE name = ?", (*bands(row['simhash']), row['name']))
+        for i in range(len(BANDS)):
+            db.execute(f"CREATE INDEX IF NOT EXISTS themes_band{i} ON themes (band{i})")
+
+    @contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute('PRAGMA journal_mode=WAL')
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _theme(self, db, name):
+        """Row for `name`, or for an existing near-duplicate of it (created if neither exists)"""
+        row = db.execute("SELECT * FROM themes WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row
+        fingerprint = simhash(name)
+        limit = Config.TREND_NEAR_DUPLICATE_BITS
+        slices = bands(fingerprint)
+        radius = limit // len(BANDS)
+        clauses, params = [], []
+        for i, (width, value) in enumerate(zip(BANDS, slices)):
+            masks = _flips(width, radius)
+            clauses.append(f"band{i} IN ({','.join('?' * len(masks))})")
+            params += [value ^ mask for mask in masks]
+        for other, other_hash in db.execute(f"SELECT name, simhash FROM themes WHERE {' OR '.join(clauses)}", params):
+            if distance(fingerprint, other_hash) <= limit:
+                return db.execute("SELECT * FROM themes WHERE name = ?", (other,)).fetchone()
+        columns = ', '.join(f'band{i}' for i in range(len(BANDS)))
+        db.execute(f"INSERT INTO themes (name, simhash, {columns}) VALUES (?, ?{', ?' * len(BANDS)})",
+                   (name, fingerprint, *slices))
+        return db.execute("SELECT * FROM themes WHERE name = ?", (name,)).fetchone()
+
+    def _signal(self, db, name, trend_log=None, history_log=None, used_at=None):
+        row = self._theme(db, name)
+        # A topic keeps its strongest trend signal; stale ones fade with time anyway
+        trend = row['trend_log'] if trend_log is None else max(row['trend_log'], trend_log)
+        history = row['history_log'] if history_log is None else _logaddexp(row['history_log'], history_log)
+        db.execute(
+            "UPDATE themes SET trend_log = ?, history_log = ?, priority = ?, "
+            "last_used = MAX(last_used, ?), uses = uses + ? WHERE name = ?",
+            (trend, history, _logaddexp(trend, history), used_at or 0, 1 if used_at else 0, row['name'])
+        )
+
+    def refresh(self, queue=None):
+        """Fold in changed trend sources and uploads finished since the last refresh"""
+        changed = 0
+        with self._db() as db:
+            if not db.execute("SELECT 1 FROM themes LIMIT 1").fetchone():
+                # Configured themes are the floor the index never drops below
+                for name in Config.CONTENT_THEMES:
+                    self._signal(db, name, trend_log=_log_weight(1.0, time.time()))
+            for source in self.sources:
+                try:
+                    stat = os.stat(source)
+                except OSError:
+                    continue
+                seen = db.execute("SELECT mtime_ns, size FROM sources WHERE path = ?", (str(source),)).fetchone()
+                if seen and (seen['mtime_ns'], seen['size']) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                for name, score, at in read_trends(source):
+                    self._signal(db, name, trend_log=_log_weight(score, at))
+                    changed += 1
+                db.execute("INSERT OR REPLACE INTO sources (path, mtime_ns, size) VALUES (?, ?, ?)",
+                           (str(source), stat.st_mtime_ns, stat.st_size))
+
+            if queue is not None:
+                cursor = db.execute("SELECT value FROM meta WHERE key = 'history'").fetchone()
+                since = cursor['value'] if cursor else 0.0
+                for job in queue.finished_since(since):
+                    content = job['payload'].get('content') or {}
+                    if content.get('theme'):
+                        # Views arrive with analytics (payload['stats']); the use itself was marked when it was posted
+                        views = _number((job['payload'].get('stats') or {}).get('views'))
+                        if views:
+                            history = _log_weight(views / Config.TREND_VIEWS_PER_POINT, job['publish_at'])
+                            self._signal(db, content['theme'], history_log=history)
+                            changed += 1
+                    since = max(since, job['updated_at'])
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('history', ?)", (since,))
+        return changed
+
+    def mark_used(self, theme, at=None):
+        """Start a theme's cooldown once a teaching on it is posted"""
+        with self._db() as db:
+            db.execute("UPDATE themes SET last_used = MAX(last_used, ?), uses = uses + 1 WHERE name = ?",
+                       (at or time.time(), theme))
+
+    def select(self, count, now=None, exclude=()):
+        """The `count` best-ranked themes that are off cooldown and not near-duplicates
+
+        Themes in `exclude` (written about but not posted yet) count as cooling
+        down. Reads the top of the priority index plus the few themes used
+        within the cooldown, so the cost does not grow with the size of the index.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - Config.TREND_COOLDOWN_HOURS * 3600
+        limit = Config.TREND_NEAR_DUPLICATE_BITS
+        with self._db() as db:
+            recent = [row['simhash'] for row in db.execute(
+                "SELECT simhash FROM themes WHERE last_used >= ? ORDER BY last_used DESC LIMIT 64", (cutoff,))]
+            candidates = db.execute(
+                "SELECT name, simhash FROM themes WHERE last_used < ? ORDER BY priority DESC LIMIT ?",
+                (cutoff, count * 8)
+            ).fetchall()
+            chosen, fingerprints = [], recent + [simhash(name) for name in exclude]
+            for row in candidates:
+                if all(distance(row['simhash'], other) > limit for other in fingerprints):
+                    chosen.append(row['name'])
+                    fingerprints.append(row['simhash'])
+                    if len(chosen) == count:
+                        return chosen
+            # Everything good is cooling down: reuse the least recently used themes
+            for row in db.execute("SELECT name FROM themes ORDER BY last_used LIMIT ?", (count,)):
+                if len(chosen) < count and row['name'] not in chosen:
+                    chosen.append(row['name'])
+        return chosen
+
+    def ranking(self, limit=20):
+        """Top themes with their priority, for inspection"""
+        with self._db() as db:
+            return [dict(row) for row in db.execute(
+                "SELECT name, priority, last_used, uses FROM themes ORDER BY priority DESC LIMIT ?", (limit,))]
+
+
+if __name__ == '__main__':
+    index = TrendIndex()
+    print(f"🔄 {index.refresh()} trend signal(s) loaded")
+    for row in index.ranking():
+        print(f"  📈 {row['priority']:8.2f}  {row['name']}  ({row['uses']} uses)")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Upload Engine - Chunked, retrying, resumable uploads
+Drives googleapiclient's next_chunk() with exponential backoff and persists the
+resumable session URI so a crashed process picks up where it left off; a video
+that is still being encoded can be uploaded as its fragments are written
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import random
+import socket
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from artifact_manager import partial_path
+from config import Config
+
+RETRIABLE_STATUS = (500, 502, 503, 504)
+RETRIABLE_REASONS = ('quotaExceeded', 'rateLimitExceeded', 'userRateLimitExceeded', 'backendError')
+EXPIRED_SESSION_STATUS = (404, 410)
+# Dropped connections, timeouts and DNS failures (plus httplib2's); not other OSErrors such as a missing file
+TRANSPORT_ERRORS = (ConnectionError, socket.timeout, TimeoutError, socket.gaierror, http.client.IncompleteRead)
+
+_state_lock = threading.Lock()
+
+
+def session_key(path):
+    """Identify one version of a file: same path, size and mtime resume the same session"""
+    stat = os.stat(path)
+    blob = f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()[:32]
+
+
+def _error_reason(error):
+    """First `reason` from a Google API error payload, if any"""
+    try:
+        payload = json.loads(error.content.decode('utf-8'))
+        return payload['error']['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+def is_retriable(error):
+    """5xx and quota/rate-limit errors are worth retrying; other 4xx are not"""
+    from googleapiclient.errors import HttpError
+    from httplib2 import HttpLib2Error
+
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRIABLE_STATUS or status == 429:
+            return True
+        return status == 403 and _error_reason(error) in RETRIABLE_REASONS
+    return isinstance(error, (HttpLib2Error, *TRANSPORT_ERRORS))
+
+
+@lru_cache(maxsize=None)
+def _growing_file_upload():
+    """Build GrowingFileUpload: it subclasses googleapiclient's MediaUpload, which is slow to import"""
+    from googleapiclient.http import MediaUpload
+
+    class GrowingFileUpload(MediaUpload):
+        """Resumable media body for a video that is still being encoded
+
+        While the encoder runs, ContentCreator keeps a hard link to its output at
+        `partial_path(path)`; fragmented MP4 is only ever appended to, so every
+        complete chunk can be sent at once. `finished()` reports that the writer
+        has stopped: the total size is then known, and `path` must be the file
+        that was being read, or the render failed.
+        """
+
+        def __init__(self, path, finished, mimetype='video/mp4', chunksize=None, poll_seconds=0.2,
+                     stall_seconds=None, sleep=time.sleep):
+            self._path = Path(path)
+            self._finished = finished
+            self._mimetype = mimetype
+            self._chunksize = chunksize or Config.UPLOAD_CHUNK_SIZE
+            self._poll_seconds = poll_seconds
+            self._stall_seconds = Config.STREAM_STALL_SECONDS if stall_seconds is None else stall_seconds
+            self._sleep = sleep
+            self._fd = None
+            self._size = None
+            self._next = 0  # where the next chunk starts
+
+        def chunksize(self):
+            return self._chunksize
+
+        def mimetype(self):
+            return self._mimetype
+
+        def size(self):
+            """The total once the encoder has finished, else None (googleapiclient then sends `*`)
+
+            googleapiclient reads this before each chunk, so it first waits
+            until the next chunk is either followed by more data or is the
+            file's last: a final chunk of exactly chunksize bytes must carry
+            the total, as the empty PUT after it would have no valid range.
+            """
+            self._wait_for(self._next + self._chunksize + 1)
+            return self._size
+
+        def resumable(self):
+            return True
+
+        def has_stream(self):
+            return False
+
+        def _available(self):
+            """Bytes readable now; fixes the total size once the writer has finished"""
+            finished = self._finished()
+            if self._fd is None:
+                try:
+                    self._fd = os.open(self._path if finished else partial_path(self._path), os.O_RDONLY)
+                except FileNotFoundError:
+                    if finished:
+                        raise RuntimeError(f"{self._path} was not rendered")
+                    return 0
+            stat = os.fstat(self._fd)
+            if finished and self._size is None:
+                try:
+                    complete = os.path.samestat(stat, os.stat(self._path))
+                except FileNotFoundError:
+                    complete = False
+                if not complete:
+                    raise RuntimeError(f"Rendering {self._path} did not finish")
+                self._size = stat.st_size
+            return stat.st_size
+
+        def _wait_for(self, end):
+            """Wait until `end` bytes have been written or the encoder has finished"""
+            last_size, last_growth = -1, time.monotonic()
+            while True:
+                available = self._available()
+                if self._size is not None or available >= end:
+                    return
+                if self._fd is None or available != last_size:
+                    # The stall clock starts once the encoder has created the file
+                    last_size, last_growth = available, time.monotonic()
+                elif time.monotonic() - last_growth > self._stall_seconds:
+                    raise RuntimeError(f"{self._path} stopped growing at {available} bytes")
+                self._sleep(self._poll_seconds)
+
+        def getbytes(self, begin, length):
+            """`length` bytes from `begin`, waiting for the encoder to write them (short only at the end)"""
+            self._wait_for(begin + length)
+            data = os.pread(self._fd, length, begin)
+            self._next = begin + len(data)
+            return data
+
+        def close(self):
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    return GrowingFileUpload
+
+
+def __getattr__(name):
+    # The class is created on first access, so importing this module does not load googleapiclient
+    if name == 'GrowingFileUpload':
+        return _growing_file_upload()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ResumableUploader:
+    def __init__(self, state_path=None, max_retries=None, base_delay=1.0, max_delay=64.0, sleep=time.sleep):
+        self.state_path = Path(state_path or Config.UPLOAD_STATE_FILE)
+        self.max_retries = Config.UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    # Session persistence
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_session(self, key, uri):
+        with _state_lock:
+            state = self._load_state()
+            if uri is None:
+                state.pop(key, None)
+            else:
+                state[key] = {'uri': uri, 'saved_at': time.time()}
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp, self.state_path)
+
+    def saved_session(self, video_path):
+        """Resumable session URI persisted for this file, if any"""
+        entry = self._load_state().get(session_key(video_path))
+        return entry['uri'] if entry else None
+
+    # Upload loop
+
+    def _backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    def upload(self, request, video_path, on_progress=None):
+        """Upload `request`'s media body chunk by chunk; returns (API response, transfer stats)
+
+        Sessions of a GrowingFileUpload are not persisted: a re-run render
+        need not reproduce the bytes already sent.
+        """
+        from googleapiclient.errors import HttpError
+
+        growing = isinstance(request.resumable, _growing_file_upload())
+        key = None if growing else session_key(video_path)
+        total = None if growing else os.path.getsize(video_path)
+        saved_uri = None if growing else self.saved_session(video_path)
+        if saved_uri:
+            # Make the next call ask the server how much it already has
+            request.resumable_uri = saved_uri
+            request._in_error_state = True
+            print(f"  ♻️ Resuming upload session for {video_path}", flush=True)
+
+        started = time.perf_counter()
+        chunk_size = request.resumable.chunksize()
+        last_progress = None
+        sent = 0
+        retries = 0
+        attempt = 0
+        response = None
+        while response is None:
+            try:
+                status, response = request.next_chunk()
+            except Exception as e:
+                if key and request.resumable_uri and request.resumable_uri != saved_uri:
+                    saved_uri = request.resumable_uri
+                    self._save_session(key, saved_uri)
+                if isinstance(e, HttpError) and e.resp.status in EXPIRED_SESSION_STATUS and saved_uri:
+                    print("  ⚠️ Saved upload session expired, starting over", flush=True)
+                    self._save_session(key, None)
+                    request.resumable_uri = None
+                    request.resumable_progress = 0
+                    request._in_error_state = False
+                    saved_uri = None
+                    continue
+                if not is_retriable(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                retries += 1
+                print(f"  ⏳ Upload error ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s", flush=True)
+                self.sleep(delay)
+                continue
+
+            attempt = 0
+            if key and request.resumable_uri and request.resumable_uri != saved_uri:
+                saved_uri = request.resumable_uri
+                self._save_session(key, saved_uri)
+            total = request.resumable.size() if growing else total
+            progress = status.resumable_progress if status else total
+            # The first call may also have skipped bytes the server already had
+            sent += min(chunk_size, progress) if last_progress is None else progress - last_progress
+            last_progress = progress
+            if on_progress:
+                on_progress(progress, total)
+
+        if key:
+            self._save_session(key, None)
+        elapsed = time.perf_counter() - started
+        stats = {
+            'bytes': total,
+            'bytes_sent': sent,
+            'seconds': elapsed,
+            'throughput_mbps': sent * 8 / elapsed / 1e6 if elapsed else 0.0,
+            'retries': retries,
+        }
+        return response, stats
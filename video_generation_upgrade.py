@@ -1,73 +1,92 @@
-import os
-import numpy as np
-from gtts import gTTS
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
+import hashlib
 import time
-from pydub import AudioSegment  # use pydub to convert mp3 to wav safely
+from config import Config
+from asset_cache import get_cache, make_key, file_digest
+import media_probe
+import render_graph
+import tracing
 
-def create_video(text="Awaken your divine potential.", output_filename="final_video.mp4"):
-    try:
-        print("🎬 [VideoGen] Starting video creation...")
-
-        # 1. Voice synthesis via gTTS (writes MP3)
-        print("🎤 [VideoGen] Generating voice-over (mp3)...")
-        mp3_path = "voice.mp3"
-        tts = gTTS(text=text, lang="en", slow=False)
-        tts.save(mp3_path)
+def synthesize_voice(text):
+    """gTTS voice-over as MP3 bytes, streamed from the service into memory"""
+    from gtts import gTTS
+    return b"".join(gTTS(text=text, lang="en", slow=False).stream())
 
-        # 2. Convert MP3 to WAV to avoid stream issues
-        print("🔄 [VideoGen] Converting MP3 → WAV")
-        wav_path = "voice.wav"
-        audio = AudioSegment.from_mp3(mp3_path)
-        audio.export(wav_path, format="wav")
+def background_graph(duration, pattern, audio_digest):
+    """Render graph of the background video, whose hash is its cache key"""
+    # Imported here so `--auto` (the engine entry point) starts without NumPy
+    if pattern == "color":
+        from background_renderer import color_graph
+        return color_graph(1280, 720, 24, audio=audio_digest, key=("color-curve", duration))
+    from sacred_geometry import geometry_graph
+    return geometry_graph(pattern, audio=audio_digest, width=1280, height=720, fps=24, duration=duration)
 
-        # Now use the WAV file
-        audio_clip = AudioFileClip(wav_path)
+def render_background(path, duration, pattern, audio_path=None, audio_data=None):
+    """Animated background at 1280x720/24fps: the flat colour curve or a geometry pattern"""
+    if pattern == "color":
+        from background_renderer import render_color_background
+        return render_color_background(path, duration, audio_path=audio_path, fps=24, audio_data=audio_data)
+    from sacred_geometry import render_geometry
+    return render_geometry(path, duration, pattern=pattern, audio_path=audio_path, audio_data=audio_data,
+                           width=1280, height=720, fps=24)
 
-        # 3. Generate background animation
-        print("🖼️ [VideoGen] Generating animated background...")
-        duration = audio_clip.duration
-        clips = []
-        fps = 24
-        frames = int(duration * fps)
-        for i in range(frames):
-            r = int(120 + 60 * np.sin(i / fps * np.pi * 2 / 5))
-            g = int(100 + 55 * np.cos(i / fps * np.pi * 2 / 7))
-            b = int(140 + 45 * np.sin(i / fps * np.pi * 2 / 11))
-            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
-            frame[:, :, 0] = r
-            frame[:, :, 1] = g
-            frame[:, :, 2] = b
-            clips.append(ImageClip(frame, duration=1.0 / fps))
-        background = concatenate_videoclips(clips, method="compose")
+def _create_video(text, output_filename, pattern):
+    print("🎬 [VideoGen] Starting video creation...")
+    cache = get_cache()
 
-        # 4. Combine video + audio
-        print("🔊 [VideoGen] Combining audio + video...")
-        video = background.set_audio(audio_clip).set_duration(audio_clip.duration)
+    # 1. Voice synthesis via gTTS, kept in memory (cached by script text)
+    print("🎤 [VideoGen] Generating voice-over...")
+    voice_parts = ("gtts", "en", "normal", text)
+    voice_path = cache.lookup(make_key(*voice_parts), ".mp3")
+    voice_data = None
+    with tracing.span("videogen.voice", cached=bool(voice_path)):
+        if voice_path:
+            voice_digest = file_digest(voice_path)
+            duration = media_probe.duration(voice_path)
+        else:
+            voice_data = synthesize_voice(text)
+            voice_digest = hashlib.sha256(voice_data).hexdigest()
+            # Duration comes from the MP3 frame headers, no decode or probe needed
+            info = media_probe.mp3_info(voice_data)
+            if info is None:
+                raise RuntimeError(f"gTTS returned {len(voice_data)} bytes with no MP3 frames")
+            duration = info.duration
 
-        # 5. Export video with safe parameters
-        print("💾 [VideoGen] Writing video file...")
-        start_time = time.time()
-        video.write_videofile(
-            output_filename,
-            fps=24,
-            codec="libx264",
-            audio_codec="aac",
-            threads=2,
-            preset="ultrafast",
-            ffmpeg_params=["-movflags", "+faststart"],
-            verbose=False,
-            logger=None
-        )
-        elapsed = time.time() - start_time
-        print(f"✅ [VideoGen] Video ready in {elapsed:.2f}s → {output_filename}")
+    # 2. Stream animated background + audio straight into ffmpeg
+    print("🖼️ [VideoGen] Rendering animated background...")
+    start_time = time.time()
+    with tracing.span("videogen.render", pattern=pattern, duration=duration):
+        graph = background_graph(duration, pattern, voice_digest)
+        cache.fetch(("render", render_graph.graph_key(graph, "video")), output_filename,
+                    lambda path: render_background(path, duration, pattern, audio_path=voice_path,
+                                                   audio_data=voice_data))
+    if voice_data is not None:
+        cache.store(voice_parts, ".mp3", voice_data)
+    elapsed = time.time() - start_time
+    print(f"✅ [VideoGen] Video ready in {elapsed:.2f}s → {output_filename}")
 
-        # Cleanup
-        background.close()
-        video.close()
-        audio_clip.close()
-        return output_filename
+    return output_filename
 
+def create_video(text="Awaken your divine potential.", output_filename="final_video.mp4", pattern=None):
+    pattern = pattern or Config.BACKGROUND_PATTERN
+    try:
+        with tracing.span("videogen.create_video", pattern=pattern):
+            return _create_video(text, output_filename, pattern)
     except Exception as e:
         print(f"❌ [VideoGen] Error: {e}")
         return None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Render a voice-over video, or run the automation engine")
+    parser.add_argument("--auto", action="store_true", help="Run the scheduled job queue once (same as empire_engine.py --once)")
+    parser.add_argument("--text", default="Awaken your divine potential.")
+    parser.add_argument("--output", default="final_video.mp4")
+    parser.add_argument("--pattern", choices=["flower_of_life", "mandala", "radial", "color"],
+                        help="Background (default: Config.BACKGROUND_PATTERN)")
+    args = parser.parse_args()
+
+    if args.auto:
+        from empire_engine import main
+        raise SystemExit(main(["--once"]))
+    raise SystemExit(0 if create_video(args.text, args.output, args.pattern) else 1)
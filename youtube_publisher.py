@@ -4,17 +4,65 @@ YouTube Publisher - Upload automation
 Publishes videos to YouTube Shorts
 """
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+import json
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlparse, urlunparse
 from config import Config
+from upload_engine import ResumableUploader
+import clients
+import tracing
+
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest'
+DISCOVERY_MAX_AGE = 30 * 86400  # seconds before the on-disk discovery document is refreshed
+
+_discovery = None
+
+def discovery_document():
+    """The YouTube Data API discovery document, parsed once per process and cached on disk
+    
+    build('youtube', 'v3') re-reads and re-parses it (or downloads it, on
+    client versions without bundled documents) for every publisher.
+    """
+    global _discovery
+    if _discovery is None:
+        path = Path(Config.YOUTUBE_DISCOVERY_CACHE)
+        try:
+            if time.time() - path.stat().st_mtime > DISCOVERY_MAX_AGE:
+                raise FileNotFoundError(path)
+            _discovery = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            document = _fetch_discovery()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(document, encoding='utf-8')
+            os.replace(tmp, path)
+            _discovery = json.loads(document)
+    return _discovery
+
+def _fetch_discovery():
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        document = get_static_doc('youtube', 'v3')
+    except ImportError:
+        document = None
+    if document is None:
+        response = clients.request('discovery', 'GET', DISCOVERY_URL)
+        response.raise_for_status()
+        document = response.text
+    return document
 
 class YouTubePublisher:
     def __init__(self):
         self.youtube = self._authenticate()
+        self.uploader = ResumableUploader()
     
     def _authenticate(self):
         """Authenticate with YouTube API"""
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build_from_document
+        
         creds = Credentials(
             token=Config.YOUTUBE_TOKEN.get('token'),
             refresh_token=Config.YOUTUBE_TOKEN.get('refresh_token'),
@@ -24,10 +72,18 @@ class YouTubePublisher:
             scopes=Config.YOUTUBE_TOKEN.get('scopes')
         )
         
-        return build('youtube', 'v3', credentials=creds)
+        client_options = {'api_endpoint': Config.YOUTUBE_API_ENDPOINT} if Config.YOUTUBE_API_ENDPOINT else None
+        return build_from_document(discovery_document(), credentials=creds, client_options=client_options)
     
-    def publish(self, video_path, content):
-        """Upload video to YouTube as Short"""
+    def publish(self, video_path, content, finished=None):
+        """Upload video to YouTube as Short
+        
+        With `finished` (a callable, true once the encoder has stopped) the
+        upload starts while video_path is still being rendered.
+        """
+        from googleapiclient.http import MediaFileUpload
+        from upload_engine import GrowingFileUpload
+        
         body = {
             'snippet': {
                 'title': f"{content['title']} #Shorts",
@@ -41,11 +97,15 @@ class YouTubePublisher:
             }
         }
         
-        media = MediaFileUpload(
-            str(video_path),
-            mimetype='video/mp4',
-            resumable=True
-        )
+        if finished:
+            media = GrowingFileUpload(video_path, finished, chunksize=Config.UPLOAD_CHUNK_SIZE)
+        else:
+            media = MediaFileUpload(
+                str(video_path),
+                mimetype='video/mp4',
+                chunksize=Config.UPLOAD_CHUNK_SIZE,
+                resumable=True
+            )
         
         request = self.youtube.videos().insert(
             part='snippet,status',
@@ -53,5 +113,18 @@ class YouTubePublisher:
             media_body=media
         )
         
-        response = request.execute()
+        if Config.YOUTUBE_API_ENDPOINT:
+            # googleapiclient moves the upload host to api_endpoint but keeps https
+            scheme = urlparse(Config.YOUTUBE_API_ENDPOINT).scheme
+            request.uri = urlunparse(urlparse(request.uri)._replace(scheme=scheme))
+        
+        try:
+            with tracing.span('youtube.upload', streamed=bool(finished)) as span:
+                response, stats = self.uploader.upload(request, video_path)
+                span['attrs']['bytes'] = stats['bytes']
+        finally:
+            if finished:
+                media.close()
+        print(f"  📤 Uploaded {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.1f}s "
+              f"({stats['throughput_mbps']:.1f} Mbit/s, {stats['retries']} retries)", flush=True)
         return response['id']